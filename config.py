@@ -34,6 +34,9 @@ class Config:
     MAX_LOSS_RATIO: float = 0.1  # 最大亏损比例（10%），当前市值/成本 < 0.9 时停止
     PAIR_COST_CHECK_DELAY_SECONDS: int = 60  # 配对成本检查延迟（秒），单边持仓超过此时间后才检查配对成本，避免交易早期过于敏感
     
+    # 执行参数
+    ORDERBOOK_TTL_SECONDS: float = 2.0  # 订单簿超过该时长未被推送更新时，下单前重新获取（应明显长于行情推送间隔）
+    
     # 日志配置
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
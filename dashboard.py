@@ -748,7 +748,8 @@ def main():
                         st.session_state.order_manager = OrderManager(
                             st.session_state.api,
                             st.session_state.current_market.condition_id,
-                            st.session_state.position
+                            st.session_state.position,
+                            orderbook_ttl=None if demo_mode else Config.ORDERBOOK_TTL_SECONDS
                         )
                         st.rerun()
                 else:
@@ -770,7 +771,8 @@ def main():
                     st.session_state.order_manager = OrderManager(
                         st.session_state.api,
                         st.session_state.current_market.condition_id,
-                        st.session_state.position
+                        st.session_state.position,
+                        orderbook_ttl=None if demo_mode else Config.ORDERBOOK_TTL_SECONDS
                     )
                     # 选择市场后立即加载一次数据
                     st.rerun()
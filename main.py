@@ -3,7 +3,10 @@
 连接真实的 Polymarket API 检测 BTC/ETH 15分钟涨跌市场
 """
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 from rich.live import Live
 from rich.console import Console
 
@@ -19,11 +22,15 @@ from src.dashboard.market_selector import MarketSelector
 from src.market.demo_data import create_demo_markets, create_demo_orderbook, update_demo_orderbook
 from typing import Optional
 
-# 配置日志
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# 配置日志：业务代码只把日志记录放入队列，由后台线程写出，事件循环不会阻塞在终端输出上
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+logging.root.setLevel(getattr(logging, Config.LOG_LEVEL))
+logging.root.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)  # 退出前写完队列中剩余的日志
 logger = logging.getLogger(__name__)
 
 
@@ -177,10 +184,12 @@ class TradingBot:
         self.console.print("[dim]正在加载市场数据...[/dim]\n")
         
         # 初始化订单管理器
+        # 演示模式的订单簿由本地推送，不向 API 重新获取
         self.order_manager = OrderManager(
             self.api,
             self.current_market.condition_id,
-            self.position
+            self.position,
+            orderbook_ttl=None if demo_mode else Config.ORDERBOOK_TTL_SECONDS
         )
             
         # 更新 Dashboard 的 order_manager 引用
@@ -202,6 +211,7 @@ class TradingBot:
         if not initial_orderbook and not demo_mode:
             self.console.print("[yellow]⚠️  无法获取订单簿，切换到演示模式...[/yellow]")
             demo_mode = True
+            self.order_manager.orderbook_ttl = None
             initial_orderbook = create_demo_orderbook()
         
         if initial_orderbook:
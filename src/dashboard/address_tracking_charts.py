@@ -3,59 +3,191 @@
 按市场显示 YES/NO 交易的时间序列图表
 """
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from datetime import datetime
-from typing import List, Dict, Optional, Set
+from dateutil.tz import tzlocal
+from typing import List, Dict, Optional, FrozenSet, Tuple
 import asyncio
+import io
+import threading
 
-from ..market.address_tracker import AddressTracker, Trade
+from ..market.address_tracker import AddressTracker, Trade, TradeAggregator
 
 
-def create_market_trade_chart(
-    trades: List[Trade], 
-    market_condition_id: str, 
-    market_title: str,
-    tracked_proxy_wallets: Optional[Set[str]] = None
-):
+# 市场交易数超过该值时，其他用户的交易改用密度图显示
+DENSITY_THRESHOLD = 5000
+
+
+def use_density_view(n_trades: int) -> bool:
+    """价格图是否改用密度图显示其他交易（地址追踪与市场分析两个页面共用此规则）"""
+    return n_trades > DENSITY_THRESHOLD
+
+
+# 价格图散点样式：(方向, 结果, 方向文字, 颜色, 符号, 边框颜色)
+TRADE_STYLES = [
+    ('BUY', 'YES', '买入', '#00CC00', 'triangle-up', 'darkgreen'),    # 亮绿色
+    ('BUY', 'NO', '买入', '#90EE90', 'circle', 'green'),              # 浅绿色
+    ('SELL', 'YES', '卖出', '#FF0000', 'triangle-down', 'darkred'),   # 亮红色
+    ('SELL', 'NO', '卖出', '#FFB6C1', 'square', 'red'),               # 浅红色
+]
+
+# 交易方向与结果的固定类别（Categorical 编码顺序）
+SIDES = ['BUY', 'SELL']
+OUTCOMES = ['YES', 'NO']
+
+# 市场状态缓存时间（秒）
+STATUS_CACHE_TTL = 300
+
+
+def timestamps_to_datetime(trades: List[Trade]) -> pd.DatetimeIndex:
     """
-    创建单个市场的交易图表
-    显示 YES 和 NO 的买卖随时间变化
+    将交易的秒级时间戳一次性向量化转换为本地时间
     
-    Args:
-        trades: 该市场的交易列表
-        market_condition_id: 市场条件ID
-        market_title: 市场标题
-        tracked_proxy_wallets: 当前追踪地址的代理钱包集合（用于标记）
+    与 datetime.fromtimestamp 结果一致，但不为每行创建 datetime 对象
+    """
+    ts = np.fromiter((t.timestamp for t in trades), dtype=np.int64, count=len(trades))
+    return pd.to_datetime(ts, unit='s', utc=True).tz_convert(tzlocal()).tz_localize(None)
+
+
+def _group_by_market(trades: List[Trade]) -> Dict[str, List[Trade]]:
     """
-    # 筛选该市场的交易
-    market_trades = [t for t in trades if t.condition_id == market_condition_id]
+    按市场分组交易，每个市场内按时间排序
     
-    if not market_trades:
-        st.warning(f"该市场没有交易数据")
-        return
+    在获取数据后调用一次，结果存入 session state，
+    之后切换市场只需一次字典查找，无需每次重跑都扫描全部交易
+    """
+    out: Dict[str, List[Trade]] = {}
+    for t in trades:
+        out.setdefault(t.condition_id, []).append(t)
+    for bucket in out.values():
+        bucket.sort(key=lambda x: x.timestamp)
+    return out
+
+
+def volume_bin_freq(span_seconds: float, target_bins: int = 200) -> str:
+    """根据交易时间跨度选择柱状图分桶频率（目标约 target_bins 根柱子）"""
+    for freq, seconds in [
+        ('10s', 10), ('30s', 30), ('1min', 60), ('5min', 300),
+        ('15min', 900), ('1h', 3600), ('4h', 14400),
+    ]:
+        if span_seconds / seconds <= target_bins:
+            return freq
+    return '1D'
+
+
+def _bin_volume(side_df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """按时间桶和 YES/NO 汇总交易数量，返回以时间为索引、YES/NO 为列的数据框"""
+    return (
+        side_df.set_index('time')
+        .groupby([pd.Grouper(freq=freq), 'outcome'], observed=False)['size']
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(columns=OUTCOMES, fill_value=0)
+    )
+
+
+def wallet_mask(wallet_cat: pd.Categorical, wallets: Optional[FrozenSet[str]]) -> np.ndarray:
+    """
+    判断每笔交易的钱包是否属于给定集合
+    
+    只对去重后的钱包（类别）做一次集合查找，再按整数编码映射回每一行
+    """
+    if not wallets:
+        return np.zeros(len(wallet_cat), dtype=bool)
+    hit_codes = np.flatnonzero(wallet_cat.categories.isin(wallets))
+    return np.isin(wallet_cat.codes, hit_codes)
+
+
+def _partition_trades(df: pd.DataFrame):
+    """
+    按 (方向, YES/NO, 是否追踪地址) 编码组号并一次稳定排序
     
-    # 按时间排序
-    market_trades.sort(key=lambda x: x.timestamp)
+    组号 = (BUY << 2) | (YES << 1) | is_tracked，取值 0..7；方向既不是 BUY 也不是 SELL 的记为 8（不显示）。
+    第 k 组的行位置为 order[bounds[k]:bounds[k + 1]]，组内保持原有时间顺序。
+    """
+    # side / outcome 为 Categorical，直接比较整数编码（BUY=0, SELL=1, 其他=-1；YES=0, NO=1）
+    side_codes = df['side'].cat.codes.to_numpy()
+    is_buy = side_codes == 0
+    is_yes = df['outcome'].cat.codes.to_numpy() == 0
+    is_tracked = df['is_tracked'].to_numpy().astype(bool)
+    
+    gid = (is_buy.astype(np.uint8) << 2) | (is_yes.astype(np.uint8) << 1) | is_tracked.astype(np.uint8)
+    gid = np.where(side_codes >= 0, gid, 8)
+    
+    order = np.argsort(gid, kind='stable')
+    bounds = np.searchsorted(gid[order], np.arange(10))
+    return order, bounds
+
+
+def build_market_df(
+    trades: List[Trade],
+    tracked_proxy_wallets: Optional[FrozenSet[str]] = None
+) -> pd.DataFrame:
+    """
+    由交易列表构建图表用数据框（两个图表共用同一套列）
     
-    # 创建数据框
+    列：time, price, size, side, value, proxy_wallet, is_tracked, outcome
+    
+    Args:
+        trades: 交易列表
+        tracked_proxy_wallets: 当前追踪地址的代理钱包集合（用于标记 is_tracked）
+    """
     df = pd.DataFrame([
         {
-            'time': datetime.fromtimestamp(t.timestamp),
             'price': t.price,
             'size': t.size,
             'side': t.side,
             'value': t.value,
-            'asset': t.asset,
-            'proxy_wallet': t.proxy_wallet,
-            'is_tracked': tracked_proxy_wallets is not None and t.proxy_wallet in tracked_proxy_wallets
+            'proxy_wallet': t.proxy_wallet
         }
-        for t in market_trades
+        for t in trades
     ])
+    if df.empty:
+        return df
+    
+    # 钱包列转为 Categorical：is_tracked、去重计数、isin 都在整数编码上进行
+    wallet_cat = pd.Categorical(df['proxy_wallet'])
+    df['proxy_wallet'] = wallet_cat
+    df['is_tracked'] = wallet_mask(wallet_cat, tracked_proxy_wallets)
+    
+    df.insert(0, 'time', timestamps_to_datetime(trades))
     
     # 判断 YES/NO：价格 > 0.5 的是 YES，<= 0.5 的是 NO
-    df['outcome'] = df['price'].apply(lambda p: 'YES' if p > 0.5 else 'NO')
+    df['outcome'] = pd.Categorical(np.where(df['price'].to_numpy() > 0.5, 'YES', 'NO'), categories=OUTCOMES)
+    df['side'] = pd.Categorical(df['side'], categories=SIDES)
+    return df
+
+
+def get_market_df(condition_id: str) -> pd.DataFrame:
+    """
+    获取当前追踪地址在某个市场的交易数据框
+    
+    每个市场只构建一次并缓存在 session state 中（获取新地址时清空），
+    切换标签页或重跑脚本时直接复用
+    """
+    market_dfs = st.session_state.market_dfs
+    if condition_id not in market_dfs:
+        market_dfs[condition_id] = build_market_df(
+            st.session_state.trades_by_market.get(condition_id, []),
+            st.session_state.tracked_wallets
+        )
+    return market_dfs[condition_id]
+
+
+def create_market_trade_chart(df: pd.DataFrame, market_title: str):
+    """
+    创建单个市场的交易图表
+    显示 YES 和 NO 的买卖随时间变化
+    
+    Args:
+        df: 该市场的交易数据框（build_market_df 构建，按时间排序）
+        market_title: 市场标题
+    """
+    if df.empty:
+        st.warning(f"该市场没有交易数据")
+        return
     
     # 创建图表
     fig = make_subplots(
@@ -69,260 +201,102 @@ def create_market_trade_chart(
     marker_size = 10
     marker_size_tracked = 14  # 当前追踪地址的交易用更大的marker
     
-    # 分离四种类型：买YES、买NO、卖YES、卖NO
-    buy_yes = df[(df['side'] == 'BUY') & (df['outcome'] == 'YES')]
-    buy_no = df[(df['side'] == 'BUY') & (df['outcome'] == 'NO')]
-    sell_yes = df[(df['side'] == 'SELL') & (df['outcome'] == 'YES')]
-    sell_no = df[(df['side'] == 'SELL') & (df['outcome'] == 'NO')]
+    # 一次排序分出八组：(买/卖) × (YES/NO) × (其他用户/追踪地址)
+    order, bounds = _partition_trades(df)
+    
+    def _group(gid: int) -> pd.DataFrame:
+        return df.iloc[order[bounds[gid]:bounds[gid + 1]]]
     
     # 第一个子图：价格图
-    # 买入 YES - 其他用户
-    if not buy_yes.empty:
-        buy_yes_others = buy_yes[~buy_yes['is_tracked']]
-        buy_yes_tracked = buy_yes[buy_yes['is_tracked']]
-        
-        # 其他用户的交易
-        if not buy_yes_others.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=buy_yes_others['time'],
-                    y=buy_yes_others['price'],
-                    mode='markers',
-                    name='买入 YES',
-                    marker=dict(
-                        size=marker_size,
-                        color='#00CC00',  # 亮绿色
-                        symbol='triangle-up',
-                        line=dict(width=1, color='darkgreen'),
-                        opacity=0.6  # 其他用户的交易半透明
-                    ),
-                    text=[f"<b>买入 YES</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(buy_yes_others['size'], buy_yes_others['price'], buy_yes_others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='buy_yes',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
-        
-        # 当前追踪地址的交易
-        if not buy_yes_tracked.empty:
+    # 交易量过大时，其他用户的交易改用二维直方图作为背景，只用散点标出追踪地址的交易
+    use_density = use_density_view(len(df))
+    if use_density:
+        others_df = df[~df['is_tracked']]
+        if not others_df.empty:
             fig.add_trace(
-                go.Scatter(
-                    x=buy_yes_tracked['time'],
-                    y=buy_yes_tracked['price'],
-                    mode='markers',
-                    name='买入 YES (⭐你的)',
-                    marker=dict(
-                        size=marker_size_tracked,
-                        color='#00CC00',  # 亮绿色
-                        symbol='triangle-up',
-                        line=dict(width=3, color='darkgreen'),  # 加粗边框
-                        opacity=1.0  # 完全不透明
-                    ),
-                    text=[f"<b>⭐ 买入 YES (你的交易)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(buy_yes_tracked['size'], buy_yes_tracked['price'], buy_yes_tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='buy_yes',
-                    showlegend=True
+                go.Histogram2d(
+                    x=others_df['time'].to_numpy(),
+                    y=others_df['price'].to_numpy(),
+                    nbinsx=200,
+                    nbinsy=50,
+                    colorscale='Greys',
+                    showscale=False,
+                    name='其他用户交易密度',
+                    hovertemplate='时间: %{x}<br>价格: %{y}<br>交易数: %{z}<extra></extra>'
                 ),
                 row=1, col=1
             )
+        highlight_note = "，⭐ 你的交易仍以散点标记" if df['is_tracked'].any() else ""
+        st.info(f"ℹ️ 该市场共 {len(df):,} 笔交易，其他用户的交易以密度图显示{highlight_note}")
     
-    # 买入 NO
-    if not buy_no.empty:
-        buy_no_others = buy_no[~buy_no['is_tracked']]
-        buy_no_tracked = buy_no[buy_no['is_tracked']]
-        
-        # 其他用户的交易
-        if not buy_no_others.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=buy_no_others['time'],
-                    y=buy_no_others['price'],
-                    mode='markers',
-                    name='买入 NO',
-                    marker=dict(
-                        size=marker_size,
-                        color='#90EE90',  # 浅绿色
-                        symbol='circle',
-                        line=dict(width=1, color='green'),
-                        opacity=0.6
-                    ),
-                    text=[f"<b>买入 NO</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(buy_no_others['size'], buy_no_others['price'], buy_no_others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='buy_no',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
+    # 四种类型（买YES、买NO、卖YES、卖NO）× (其他用户 / 当前追踪地址)
+    for side, outcome, side_label, color, symbol, edge_color in TRADE_STYLES:
+        base_gid = (int(side == 'BUY') << 2) | (int(outcome == 'YES') << 1)
+        label = f'{side_label} {outcome}'
         
-        # 当前追踪地址的交易
-        if not buy_no_tracked.empty:
+        for is_tracked, name, hover_title, size, line_width, opacity in [
+            # 其他用户的交易半透明
+            (False, label, label, marker_size, 1, 0.6),
+            # 当前追踪地址的交易：加粗边框、完全不透明
+            (True, f'{label} (⭐你的)', f'⭐ {label} (你的交易)', marker_size_tracked, 3, 1.0),
+        ]:
+            if use_density and not is_tracked:
+                continue
+            
+            sub = _group(base_gid | int(is_tracked))
+            if sub.empty:
+                continue
+            
             fig.add_trace(
                 go.Scatter(
-                    x=buy_no_tracked['time'],
-                    y=buy_no_tracked['price'],
+                    x=sub['time'].to_numpy(),
+                    y=sub['price'].to_numpy(),
                     mode='markers',
-                    name='买入 NO (⭐你的)',
+                    name=name,
                     marker=dict(
-                        size=marker_size_tracked,
-                        color='#90EE90',  # 浅绿色
-                        symbol='circle',
-                        line=dict(width=3, color='green'),
-                        opacity=1.0
+                        size=size,
+                        color=color,
+                        symbol=symbol,
+                        line=dict(width=line_width, color=edge_color),
+                        opacity=opacity
                     ),
-                    text=[f"<b>⭐ 买入 NO (你的交易)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(buy_no_tracked['size'], buy_no_tracked['price'], buy_no_tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='buy_no',
+                    customdata=sub[['size', 'price', 'value']].to_numpy(),
+                    hovertemplate=f'<b>{hover_title}</b><br>数量: %{{customdata[0]:.0f}} shares<br>价格: $%{{customdata[1]:.3f}}<br>金额: $%{{customdata[2]:.2f}}<br>时间: %{{x}}<extra></extra>',
+                    legendgroup=f'{side.lower()}_{outcome.lower()}',
                     showlegend=True
                 ),
                 row=1, col=1
             )
     
-    # 卖出 YES
-    if not sell_yes.empty:
-        sell_yes_others = sell_yes[~sell_yes['is_tracked']]
-        sell_yes_tracked = sell_yes[sell_yes['is_tracked']]
-        
-        # 其他用户的交易
-        if not sell_yes_others.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=sell_yes_others['time'],
-                    y=sell_yes_others['price'],
-                    mode='markers',
-                    name='卖出 YES',
-                    marker=dict(
-                        size=marker_size,
-                        color='#FF0000',  # 亮红色
-                        symbol='triangle-down',
-                        line=dict(width=1, color='darkred'),
-                        opacity=0.6
-                    ),
-                    text=[f"<b>卖出 YES</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(sell_yes_others['size'], sell_yes_others['price'], sell_yes_others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='sell_yes',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
-        
-        # 当前追踪地址的交易
-        if not sell_yes_tracked.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=sell_yes_tracked['time'],
-                    y=sell_yes_tracked['price'],
-                    mode='markers',
-                    name='卖出 YES (⭐你的)',
-                    marker=dict(
-                        size=marker_size_tracked,
-                        color='#FF0000',  # 亮红色
-                        symbol='triangle-down',
-                        line=dict(width=3, color='darkred'),
-                        opacity=1.0
-                    ),
-                    text=[f"<b>⭐ 卖出 YES (你的交易)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(sell_yes_tracked['size'], sell_yes_tracked['price'], sell_yes_tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='sell_yes',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
+    # 第二个子图：数量柱状图（按时间分桶聚合，避免每笔交易一根柱子）
+    bin_freq = volume_bin_freq((df['time'].iloc[-1] - df['time'].iloc[0]).total_seconds())
+    buy_idx = order[bounds[4]:bounds[8]]
+    sell_idx = order[bounds[0]:bounds[4]]
+    buy_df = df.iloc[buy_idx]
+    sell_df = df.iloc[sell_idx]
     
-    # 卖出 NO
-    if not sell_no.empty:
-        sell_no_others = sell_no[~sell_no['is_tracked']]
-        sell_no_tracked = sell_no[sell_no['is_tracked']]
-        
-        # 其他用户的交易
-        if not sell_no_others.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=sell_no_others['time'],
-                    y=sell_no_others['price'],
-                    mode='markers',
-                    name='卖出 NO',
-                    marker=dict(
-                        size=marker_size,
-                        color='#FFB6C1',  # 浅红色
-                        symbol='square',
-                        line=dict(width=1, color='red'),
-                        opacity=0.6
-                    ),
-                    text=[f"<b>卖出 NO</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(sell_no_others['size'], sell_no_others['price'], sell_no_others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='sell_no',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
+    for side_df, sign, side_label, outcome_colors in [
+        (buy_df, 1, '买入', {'YES': '#00CC00', 'NO': '#90EE90'}),    # 买入数量（正值）
+        (sell_df, -1, '卖出', {'YES': '#FF0000', 'NO': '#FFB6C1'}),  # 卖出数量（负值显示在下方）
+    ]:
+        if side_df.empty:
+            continue
         
-        # 当前追踪地址的交易
-        if not sell_no_tracked.empty:
+        bins = _bin_volume(side_df, bin_freq)
+        for outcome, color in outcome_colors.items():
             fig.add_trace(
-                go.Scatter(
-                    x=sell_no_tracked['time'],
-                    y=sell_no_tracked['price'],
-                    mode='markers',
-                    name='卖出 NO (⭐你的)',
-                    marker=dict(
-                        size=marker_size_tracked,
-                        color='#FFB6C1',  # 浅红色
-                        symbol='square',
-                        line=dict(width=3, color='red'),
-                        opacity=1.0
-                    ),
-                    text=[f"<b>⭐ 卖出 NO (你的交易)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(sell_no_tracked['size'], sell_no_tracked['price'], sell_no_tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    legendgroup='sell_no',
-                    showlegend=True
+                go.Bar(
+                    x=bins.index.to_numpy(),
+                    y=sign * bins[outcome].to_numpy(),
+                    name=f'{side_label} {outcome}',
+                    marker=dict(color=color),
+                    offsetgroup=outcome.lower(),
+                    showlegend=False,
+                    hovertemplate=f'{side_label} {outcome}<br>数量: %{{y:.0f}} shares<br>时间: %{{x}}<extra></extra>'
                 ),
-                row=1, col=1
+                row=2, col=1
             )
     
-    # 第二个子图：数量柱状图
-    # 买入数量（正值）
-    buy_df = df[df['side'] == 'BUY']
-    if not buy_df.empty:
-        colors = ['#00CC00' if o == 'YES' else '#90EE90' for o in buy_df['outcome']]
-        fig.add_trace(
-            go.Bar(
-                x=buy_df['time'],
-                y=buy_df['size'],
-                name='买入数量',
-                marker=dict(color=colors),
-                showlegend=False,
-                text=[f"{o}" for o in buy_df['outcome']],
-                hovertemplate='买入 %{text}<br>数量: %{y:.0f} shares<br>时间: %{x}<extra></extra>'
-            ),
-            row=2, col=1
-        )
-    
-    # 卖出数量（负值）
-    sell_df = df[df['side'] == 'SELL']
-    if not sell_df.empty:
-        colors = ['#FF0000' if o == 'YES' else '#FFB6C1' for o in sell_df['outcome']]
-        fig.add_trace(
-            go.Bar(
-                x=sell_df['time'],
-                y=-sell_df['size'],  # 负值显示在下方
-                name='卖出数量',
-                marker=dict(color=colors),
-                showlegend=False,
-                text=[f"{o}" for o in sell_df['outcome']],
-                hovertemplate='卖出 %{text}<br>数量: %{y:.0f} shares<br>时间: %{x}<extra></extra>'
-            ),
-            row=2, col=1
-        )
-    
     # 更新布局
     fig.update_xaxes(title_text="时间", row=2, col=1)
     fig.update_yaxes(title_text="价格 ($)", row=1, col=1)
@@ -349,94 +323,148 @@ def create_market_trade_chart(
     # 显示图表
     st.plotly_chart(fig, use_container_width=True)
     
-    # 显示统计信息
+    # 显示统计信息（直接在 numpy 数组上计算）
+    price_arr = df['price'].to_numpy()
+    avg_buy_price = price_arr[buy_idx].mean() if len(buy_idx) else 0.0
+    avg_sell_price = price_arr[sell_idx].mean() if len(sell_idx) else 0.0
+    total_volume = df['value'].to_numpy().sum()
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("总交易数", len(market_trades))
+        st.metric("总交易数", len(df))
     
     with col2:
-        avg_buy_price = buy_df['price'].mean() if not buy_df.empty else 0
         st.metric("平均买入价", f"${avg_buy_price:.3f}")
     
     with col3:
-        avg_sell_price = sell_df['price'].mean() if not sell_df.empty else 0
         st.metric("平均卖出价", f"${avg_sell_price:.3f}")
     
     with col4:
-        total_volume = df['value'].sum()
         st.metric("总交易额", f"${total_volume:.2f}")
 
 
-async def get_market_all_trades(condition_id: str, limit: int = 200) -> List[Trade]:
+@st.cache_resource(show_spinner=False)
+def get_tracker() -> AddressTracker:
+    """
+    获取进程内共享的 AddressTracker
+    
+    所有会话复用同一个 httpx 客户端（连接池），避免每次请求都重新建立 TCP/TLS 连接；
+    客户端只在共享的后台事件循环中使用，进程内只有一个，不随会话关闭而泄漏
+    """
+    return AddressTracker()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    获取进程内共享的后台事件循环（首次调用时在守护线程中启动）
+    
+    httpx 客户端绑定创建它的事件循环，asyncio.run 每次新建循环会导致连接池无法复用，
+    因此 tracker 的所有请求都提交到这个常驻后台线程的事件循环中执行
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True, name="address-tracker-loop").start()
+    return loop
+
+
+def run_async(coro):
+    """将协程提交到后台事件循环并等待结果"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
+
+
+async def get_market_all_trades(
+    condition_id: str,
+    limit: int = 200,
+    tracker: Optional[AddressTracker] = None
+) -> List[Trade]:
     """获取市场的所有交易（用于对比）"""
+    if tracker is not None:
+        return await tracker.get_market_trades(condition_id, limit=limit)
     async with AddressTracker() as tracker:
         return await tracker.get_market_trades(condition_id, limit=limit)
 
 
-async def get_market_all_trades_paginated(condition_id: str, max_trades: Optional[int] = None) -> List[Trade]:
-    """获取市场的所有交易（分页获取，突破限制）"""
-    async with AddressTracker() as tracker:
-        return await tracker.get_all_market_trades(condition_id, max_trades=max_trades, batch_size=1000)
+def iter_async(agen):
+    """
+    在后台事件循环中逐项驱动异步生成器
+    
+    每取出一项就回到脚本线程，调用方可在两项之间更新界面（如分页进度）
+    """
+    async def _next():
+        try:
+            return True, await agen.__anext__()
+        except StopAsyncIteration:
+            return False, None
+    
+    while True:
+        has_item, item = run_async(_next())
+        if not has_item:
+            return
+        yield item
+
+
+@st.cache_data(ttl=STATUS_CACHE_TTL, show_spinner=False)
+def fetch_market_statuses(slugs: Tuple[str, ...]) -> Dict[str, Optional[Dict]]:
+    """
+    并发获取多个市场的状态
+    
+    以市场 slug 元组为缓存键：只有市场列表变化（新地址或新的交易数量）时才重新请求，
+    切换筛选条件或选中市场直接命中缓存。结果在所有会话间共享，这里自行创建客户端，
+    不依赖页面其他部分使用的 tracker 和事件循环
+    """
+    async def _fetch():
+        async with AddressTracker() as tracker:
+            results = await asyncio.gather(*(tracker.get_market_status(slug) for slug in slugs))
+        return dict(zip(slugs, results))
+    
+    return asyncio.run(_fetch())
 
 
 def create_market_comparison_chart(
-    my_trades: List[Trade],
-    all_trades: List[Trade],
+    my_trades_by_market: Dict[str, List[Trade]],
+    all_df: pd.DataFrame,
     market_condition_id: str,
-    market_title: str,
-    tracked_proxy_wallets: Optional[Set[str]] = None
+    market_title: str
 ):
     """
     创建市场对比图表
     显示自己的交易 vs 市场所有交易
     
     Args:
-        my_trades: 自己的交易列表
-        all_trades: 市场所有交易列表
+        my_trades_by_market: 自己的交易（按市场分组）
+        all_df: 市场所有交易的数据框（build_market_df 构建，is_tracked 标记追踪地址）
         market_condition_id: 市场条件ID
         market_title: 市场标题
-        tracked_proxy_wallets: 当前追踪地址的代理钱包集合（用于标记）
     """
-    # 筛选该市场的交易
-    my_market_trades = [t for t in my_trades if t.condition_id == market_condition_id]
+    # 该市场自己的交易
+    my_market_trades = my_trades_by_market.get(market_condition_id, [])
     
-    if not my_market_trades or not all_trades:
+    if not my_market_trades or all_df.empty:
         st.warning("没有足够的数据进行对比")
         return
     
-    # 创建数据框
-    all_df = pd.DataFrame([
-        {
-            'time': datetime.fromtimestamp(t.timestamp),
-            'price': t.price,
-            'size': t.size,
-            'side': t.side,
-            'wallet': t.proxy_wallet
-        }
-        for t in all_trades
-    ])
-    
-    # 获取当前追踪地址的所有代理钱包
-    if tracked_proxy_wallets:
-        my_wallets = tracked_proxy_wallets
-    else:
-        # 如果没有提供，从交易中提取
-        my_wallets = set(t.proxy_wallet for t in my_market_trades)
+    # 一次性计算钱包和方向掩码，后续切片复用
+    is_mine = all_df['is_tracked'].to_numpy()
+    if not is_mine.any():
+        # 没有追踪地址的代理钱包时，从自己的交易中提取
+        my_wallets = frozenset(t.proxy_wallet for t in my_market_trades)
+        is_mine = wallet_mask(all_df['proxy_wallet'].array, my_wallets)
+    is_buy = all_df['side'].eq('BUY').to_numpy()
+    is_sell = all_df['side'].eq('SELL').to_numpy()
     
     # 创建图表
     fig = go.Figure()
     
     # 市场所有交易（作为背景）
-    other_trades = all_df[~all_df['wallet'].isin(my_wallets)]
-    if not other_trades.empty:
+    if not is_mine.all():
         # 买入
-        other_buy = other_trades[other_trades['side'] == 'BUY']
+        other_buy = all_df[~is_mine & is_buy]
         if not other_buy.empty:
             fig.add_trace(
                 go.Scatter(
-                    x=other_buy['time'],
-                    y=other_buy['price'],
+                    x=other_buy['time'].to_numpy(),
+                    y=other_buy['price'].to_numpy(),
                     mode='markers',
                     name='其他人买入',
                     marker=dict(
@@ -450,12 +478,12 @@ def create_market_comparison_chart(
             )
         
         # 卖出
-        other_sell = other_trades[other_trades['side'] == 'SELL']
+        other_sell = all_df[~is_mine & is_sell]
         if not other_sell.empty:
             fig.add_trace(
                 go.Scatter(
-                    x=other_sell['time'],
-                    y=other_sell['price'],
+                    x=other_sell['time'].to_numpy(),
+                    y=other_sell['price'].to_numpy(),
                     mode='markers',
                     name='其他人卖出',
                     marker=dict(
@@ -469,15 +497,14 @@ def create_market_comparison_chart(
             )
     
     # 我的交易（高亮显示）
-    my_df = all_df[all_df['wallet'].isin(my_wallets)]
-    if not my_df.empty:
+    if is_mine.any():
         # 买入
-        my_buy = my_df[my_df['side'] == 'BUY']
+        my_buy = all_df[is_mine & is_buy]
         if not my_buy.empty:
             fig.add_trace(
                 go.Scatter(
-                    x=my_buy['time'],
-                    y=my_buy['price'],
+                    x=my_buy['time'].to_numpy(),
+                    y=my_buy['price'].to_numpy(),
                     mode='markers',
                     name='⭐ 我的买入',
                     marker=dict(
@@ -486,19 +513,18 @@ def create_market_comparison_chart(
                         symbol='star',
                         line=dict(width=2, color='darkgreen')
                     ),
-                    text=[f"数量: {s:.0f}<br>价格: ${p:.3f}" 
-                          for s, p in zip(my_buy['size'], my_buy['price'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>'
+                    customdata=my_buy[['size', 'price']].to_numpy(),
+                    hovertemplate='数量: %{customdata[0]:.0f}<br>价格: $%{customdata[1]:.3f}<br>时间: %{x}<extra></extra>'
                 )
             )
         
         # 卖出
-        my_sell = my_df[my_df['side'] == 'SELL']
+        my_sell = all_df[is_mine & is_sell]
         if not my_sell.empty:
             fig.add_trace(
                 go.Scatter(
-                    x=my_sell['time'],
-                    y=my_sell['price'],
+                    x=my_sell['time'].to_numpy(),
+                    y=my_sell['price'].to_numpy(),
                     mode='markers',
                     name='⭐ 我的卖出',
                     marker=dict(
@@ -507,9 +533,8 @@ def create_market_comparison_chart(
                         symbol='star',
                         line=dict(width=2, color='darkred')
                     ),
-                    text=[f"数量: {s:.0f}<br>价格: ${p:.3f}" 
-                          for s, p in zip(my_sell['size'], my_sell['price'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>'
+                    customdata=my_sell[['size', 'price']].to_numpy(),
+                    hovertemplate='数量: %{customdata[0]:.0f}<br>价格: $%{customdata[1]:.3f}<br>时间: %{x}<extra></extra>'
                 )
             )
     
@@ -553,6 +578,12 @@ def display_address_tracking_with_charts():
         st.session_state.trades_data = None
     if 'analysis_data' not in st.session_state:
         st.session_state.analysis_data = None
+    if 'trades_by_market' not in st.session_state:
+        st.session_state.trades_by_market = {}
+    if 'tracked_wallets' not in st.session_state:
+        st.session_state.tracked_wallets = frozenset()
+    if 'market_dfs' not in st.session_state:
+        st.session_state.market_dfs = {}
     
     # 输入地址和设置
     col1, col2, col3 = st.columns([3, 1, 1])
@@ -591,18 +622,25 @@ def display_address_tracking_with_charts():
         with st.spinner(f"正在获取地址 {address} 的交易数据（最多 {trade_limit} 笔）..."):
             try:
                 # 获取交易数据（使用分页方法突破500笔限制）
+                tracker = get_tracker()
+                
                 async def fetch_data():
-                    async with AddressTracker() as tracker:
-                        trades = await tracker.get_all_address_trades(address, max_trades=trade_limit)
-                        analysis = tracker.analyze_trades(trades)
-                        return trades, analysis
+                    # 分页时逐页累加统计，获取完成即得到分析结果
+                    aggregator = TradeAggregator()
+                    trades = await tracker.get_all_address_trades(
+                        address, max_trades=trade_limit, aggregator=aggregator
+                    )
+                    return trades, aggregator.snapshot()
                 
-                trades, analysis = asyncio.run(fetch_data())
+                trades, analysis = run_async(fetch_data())
                 
                 # 保存到 session state
                 st.session_state.tracked_address = address
                 st.session_state.trades_data = trades
                 st.session_state.analysis_data = analysis
+                st.session_state.trades_by_market = _group_by_market(trades)
+                st.session_state.tracked_wallets = frozenset(analysis.get('proxy_wallets', ()))
+                st.session_state.market_dfs = {}
             except Exception as e:
                 st.error(f"❌ 获取数据失败: {e}")
                 import traceback
@@ -613,6 +651,7 @@ def display_address_tracking_with_charts():
     if st.session_state.trades_data and st.session_state.analysis_data:
         trades = st.session_state.trades_data
         analysis = st.session_state.analysis_data
+        trades_by_market = st.session_state.trades_by_market
         
         if not trades:
             st.warning("❌ 未找到该地址的交易记录")
@@ -692,24 +731,19 @@ def display_address_tracking_with_charts():
             - 查看所有历史？选择 "全部市场"
             """)
         
-        # 获取市场状态（异步批量获取）
-        async def get_markets_status():
-            async with AddressTracker() as tracker:
-                statuses = {}
-                for condition_id, info in sorted_markets[:30]:  # 限制获取前30个
-                    slug = info['slug']
-                    status = await tracker.get_market_status(slug)
-                    statuses[condition_id] = status
-                return statuses
-        
-        # 显示加载状态
+        # 获取市场状态（并发批量获取，结果按 slug 缓存）
+        top_markets = sorted_markets[:30]  # 限制获取前30个
         with st.spinner("正在获取市场状态..."):
-            market_statuses = asyncio.run(get_markets_status())
+            statuses_by_slug = fetch_market_statuses(tuple(info['slug'] for _, info in top_markets))
+        market_statuses = {
+            condition_id: statuses_by_slug.get(info['slug'])
+            for condition_id, info in top_markets
+        }
         
         # 创建市场选项（包含状态）并筛选
         market_options = []
         market_mapping = []  # 存储实际的市场索引
-        for idx, (condition_id, info) in enumerate(sorted_markets[:30]):
+        for idx, (condition_id, info) in enumerate(top_markets):
             status = market_statuses.get(condition_id)
             
             # 判断市场状态
@@ -799,9 +833,8 @@ def display_address_tracking_with_charts():
             
             with tab1:
                 st.markdown("### 交易时间序列")
-                # 传入追踪地址的代理钱包，用于标记
-                tracked_wallets = set(analysis['proxy_wallets'])
-                create_market_trade_chart(trades, condition_id, market_title, tracked_wallets)
+                # 数据框按市场缓存（已用追踪地址的代理钱包标记）
+                create_market_trade_chart(get_market_df(condition_id), market_title)
             
             with tab2:
                 st.markdown("### 市场整体交易对比")
@@ -858,7 +891,11 @@ def display_address_tracking_with_charts():
                 # 获取市场所有交易
                 if fetch_mode == "限制数量":
                     with st.spinner(f"正在获取市场数据（最多 {market_trade_limit} 笔）..."):
-                        all_trades = asyncio.run(get_market_all_trades(condition_id, limit=market_trade_limit))
+                        all_trades = run_async(get_market_all_trades(
+                            condition_id,
+                            limit=market_trade_limit,
+                            tracker=get_tracker()
+                        ))
                 else:
                     max_trades_param = None if max_limit == 0 else max_limit
                     spinner_text = "正在分页获取市场所有交易..." if max_limit == 0 else f"正在分页获取市场交易（最多 {max_limit:,} 笔）..."
@@ -868,23 +905,36 @@ def display_address_tracking_with_charts():
                         progress_placeholder = st.empty()
                         progress_placeholder.info("📊 开始分页获取... 每批1000笔")
                         
-                        all_trades = asyncio.run(get_market_all_trades_paginated(
-                            condition_id, 
-                            max_trades=max_trades_param
-                        ))
+                        # 逐页拉取：每页返回后立即刷新进度，而不是等全部分页结束
+                        all_trades = []
+                        pages = get_tracker().stream_market_trades_parallel(
+                            condition_id,
+                            max_trades=max_trades_param,
+                            batch_size=1000
+                        )
+                        for page in iter_async(pages):
+                            all_trades.extend(page)
+                            if max_trades_param:
+                                progress_placeholder.info(f"📊 已获取 {len(all_trades):,}/{max_trades_param:,} 笔...")
+                            else:
+                                progress_placeholder.info(f"📊 已获取 {len(all_trades):,} 笔...")
                         
                         progress_placeholder.success(f"✓ 分页获取完成！共 {len(all_trades):,} 笔交易")
                     
                     if all_trades:
+                        # 构建一次数据框，统计、导出和图表共用（向量化计算，不再逐笔遍历）
+                        all_df = build_market_df(all_trades, st.session_state.tracked_wallets)
+                        
                         # 显示统计信息
-                        all_traders = set(t.proxy_wallet for t in all_trades)
-                        buy_count = len([t for t in all_trades if t.side == 'BUY'])
-                        sell_count = len([t for t in all_trades if t.side == 'SELL'])
+                        is_buy = all_df['side'].eq('BUY').to_numpy()
+                        is_sell = all_df['side'].eq('SELL').to_numpy()
+                        all_traders_count = all_df['proxy_wallet'].nunique()
+                        buy_count = int(is_buy.sum())
+                        sell_count = int(is_sell.sum())
                         
-                        # 统计当前追踪地址的交易
-                        tracked_wallets = set(analysis['proxy_wallets'])
-                        my_trades_in_market = [t for t in all_trades if t.proxy_wallet in tracked_wallets]
-                        my_trades_count = len(my_trades_in_market)
+                        # 统计当前追踪地址的交易（is_tracked 掩码只算一次，统计和导出共用）
+                        is_mine = all_df['is_tracked'].to_numpy()
+                        my_trades_count = int(is_mine.sum())
                         
                         st.success(f"✓ 获取到该市场的 {len(all_trades)} 笔交易（其中 ⭐ 你的交易：{my_trades_count} 笔）")
                         
@@ -892,7 +942,7 @@ def display_address_tracking_with_charts():
                         with col1:
                             st.metric("总交易数", len(all_trades))
                         with col2:
-                            st.metric("交易者数", len(all_traders))
+                            st.metric("交易者数", all_traders_count)
                         with col3:
                             st.metric("买入交易", buy_count)
                         with col4:
@@ -903,18 +953,19 @@ def display_address_tracking_with_charts():
                         # 市场数据统计
                         with st.expander("📊 市场交易详细统计", expanded=False):
                             # 价格范围
-                            prices = [t.price for t in all_trades]
+                            price_stats = all_df['price'].agg(['min', 'max', 'mean'])
                             st.markdown(f"""
                             **价格统计**：
-                            - 最低价：${min(prices):.3f}
-                            - 最高价：${max(prices):.3f}
-                            - 平均价：${sum(prices)/len(prices):.3f}
+                            - 最低价：${price_stats['min']:.3f}
+                            - 最高价：${price_stats['max']:.3f}
+                            - 平均价：${price_stats['mean']:.3f}
                             """)
                             
                             # 交易量统计
-                            total_volume = sum(t.value for t in all_trades)
-                            buy_volume = sum(t.value for t in all_trades if t.side == 'BUY')
-                            sell_volume = sum(t.value for t in all_trades if t.side == 'SELL')
+                            values = all_df['value'].to_numpy()
+                            total_volume = values.sum()
+                            buy_volume = values[is_buy].sum()
+                            sell_volume = values[is_sell].sum()
                             
                             st.markdown(f"""
                             **交易量统计**：
@@ -924,11 +975,8 @@ def display_address_tracking_with_charts():
                             """)
                             
                             # 时间范围
-                            timestamps = [t.timestamp for t in all_trades]
-                            from datetime import datetime
-                            start_time = datetime.fromtimestamp(min(timestamps))
-                            end_time = datetime.fromtimestamp(max(timestamps))
-                            duration = max(timestamps) - min(timestamps)
+                            start_time, end_time = all_df['time'].agg(['min', 'max'])
+                            duration = (end_time - start_time).total_seconds()
                             
                             st.markdown(f"""
                             **时间范围**：
@@ -941,27 +989,23 @@ def display_address_tracking_with_charts():
                         st.markdown("---")
                         st.subheader("📥 导出市场数据")
                         
-                        # 准备CSV数据
-                        import pandas as pd
-                        tracked_wallets = set(analysis['proxy_wallets'])
-                        export_data = []
-                        for t in all_trades:
-                            is_mine = t.proxy_wallet in tracked_wallets
-                            export_data.append({
-                                '时间': datetime.fromtimestamp(t.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
-                                '方向': t.side,
-                                '价格': t.price,
-                                '数量': t.size,
-                                '金额': t.value,
-                                '是否为追踪地址': '⭐ 是' if is_mine else '否',
-                                '钱包地址': t.proxy_wallet,
-                                '市场标题': t.title,
-                                '市场链接': t.market_url
-                            })
-                        
-                        df_export = pd.DataFrame(export_data)
+                        # 准备CSV数据（按列向量化构建，不再逐行拼字典）
+                        df_export = pd.DataFrame({
+                            '时间': all_df['time'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+                            '方向': all_df['side'],
+                            '价格': all_df['price'],
+                            '数量': all_df['size'],
+                            '金额': all_df['value'],
+                            '是否为追踪地址': np.where(is_mine, '⭐ 是', '否'),
+                            '钱包地址': all_df['proxy_wallet'],
+                            '市场标题': [t.title for t in all_trades],
+                            '市场链接': [t.market_url for t in all_trades]
+                        })
                         
-                        csv = df_export.to_csv(index=False).encode('utf-8-sig')  # 使用 utf-8-sig 支持中文
+                        # 直接以 utf-8-sig（支持中文）编码写入字节缓冲区，避免先生成完整字符串再 encode
+                        csv_buffer = io.BytesIO()
+                        df_export.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
+                        csv = csv_buffer.getvalue()
                         
                         st.download_button(
                             label=f"📥 下载 CSV ({len(all_trades)} 笔交易)",
@@ -974,14 +1018,11 @@ def display_address_tracking_with_charts():
                         
                         st.markdown("---")
                         
-                        # 传入追踪地址的代理钱包，用于标记
-                        tracked_wallets = set(analysis['proxy_wallets'])
                         create_market_comparison_chart(
-                            trades,
-                            all_trades,
+                            trades_by_market,
+                            all_df,
                             condition_id,
-                            market_title,
-                            tracked_wallets
+                            market_title
                         )
                     else:
                         st.warning("无法获取市场数据")
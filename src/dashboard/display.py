@@ -2,19 +2,50 @@
 实时监控面板：显示 Pair Cost 等关键指标
 """
 import asyncio
+import operator
+from collections import deque
 from datetime import datetime
-from typing import Optional
+from itertools import islice
+from typing import Callable, Deque, Dict, Hashable, Optional, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.live import Live
 from rich.panel import Panel
 from rich.layout import Layout
 from rich.text import Text
+from config import Config
 from src.core.position import PairPosition
 from src.market.polymarket_api import OrderBook
 from src.market.event_detector import EventDetector
 from src.execution.order_manager import OrderManager
-from typing import List
+
+# 价格图表保留的最近数据点数
+PRICE_HISTORY_SIZE = 30
+
+# 最多保留的交易日志条数
+MAX_TRADE_LOGS = 100
+
+# 行情表状态文字（按"中间价是否在入场区间内"索引）
+BUY_STATUS_LABELS = ("⚪ 等待", "🟢 可买入")
+
+
+def _push_window(
+    window: Deque[Tuple[int, float]],
+    seq: int,
+    value: float,
+    dominated: Callable[[float, float], bool]
+) -> None:
+    """
+    单调队列：维护最近 PRICE_HISTORY_SIZE 个点的最小值/最大值（均摊 O(1)）
+    
+    dominated(old, new) 为真时队尾旧值不可能再成为极值，直接弹出；
+    队首即为当前窗口的极值
+    """
+    while window and dominated(window[-1][1], value):
+        window.pop()
+    window.append((seq, value))
+    while window[0][0] <= seq - PRICE_HISTORY_SIZE:
+        window.popleft()
 
 
 class Dashboard:
@@ -27,11 +58,25 @@ class Dashboard:
         self.console = Console()
         self.history = []  # 存储历史数据用于图表
         self.current_orderbook: Optional[OrderBook] = None
-        self.trade_logs: List[str] = []  # 交易日志
-        self.price_history: List[dict] = []  # 价格历史（用于图表）
+        self.trade_logs: Deque[str] = deque(maxlen=MAX_TRADE_LOGS)  # 交易日志（满时自动淘汰最旧的）
+        self.price_history: Deque[dict] = deque(maxlen=PRICE_HISTORY_SIZE)  # 价格历史（用于图表）
+        # 价格窗口的单调队列 (序号, 价格)，队首分别为最小值/最大值
+        self._price_seq = 0
+        self._last_price: Optional[Tuple[float, float]] = None  # 最近一次记录的 (YES, NO) 价格
+        self._yes_min: Deque[Tuple[int, float]] = deque()
+        self._yes_max: Deque[Tuple[int, float]] = deque()
+        self._no_min: Deque[Tuple[int, float]] = deque()
+        self._no_max: Deque[Tuple[int, float]] = deque()
+        # 每帧开始时计算一次的持仓派生值，各面板共用
+        self._pair_cost = position.pair_cost
+        self._is_profitable = position.is_profitable()
+        # 面板缓存：名称 -> (输入数据键, Panel)
+        self._panel_cache: Dict[str, Tuple[Hashable, Panel]] = {}
+        self._logs_version = 0  # 日志变化计数，用于日志面板缓存失效
+        self._layout = self._build_skeleton()  # 布局骨架，每帧只更新各区域内容
     
-    def create_layout(self, order_book: OrderBook) -> Layout:
-        """创建布局"""
+    def _build_skeleton(self) -> Layout:
+        """构建面板布局骨架（各区域按名称更新内容，无需每帧重建）"""
         layout = Layout()
         
         layout.split_column(
@@ -57,43 +102,89 @@ class Dashboard:
             Layout(name="logs")
         )
         
+        return layout
+    
+    def create_layout(self, order_book: OrderBook) -> Layout:
+        """更新各面板内容并返回布局（布局骨架只在初始化时构建一次）"""
+        layout = self._layout
+        
+        # 除价格图和行情（每帧都会变化）外，各面板按输入数据缓存，数据未变化时直接复用
+        position = self.position
+        self._pair_cost = pair_cost = position.pair_cost
+        self._is_profitable = is_profitable = position.is_profitable()
+        
         # Header
         market_info = self.event_detector.get_market_info()
-        header_text = Text("📊 15分钟预测市场双边对冲套利 Bot [模拟模式]", style="bold blue")
-        if market_info:
-            header_text.append(f" | {market_info['question'][:60]}", style="cyan")
-        layout["header"].update(Panel(header_text, border_style="blue"))
+        question = market_info['question'] if market_info else None
+        layout["header"].update(self._cached_panel("header", question, lambda: self._create_header_panel(question)))
         
         # Price Chart Panel
         price_chart = self._create_price_chart(order_book)
         layout["price_chart"].update(Panel(price_chart, title="📈 实时价格", border_style="cyan"))
         
         # Position Panel
-        pos_table = self._create_position_table()
-        layout["position"].update(Panel(pos_table, title="💼 持仓信息", border_style="green"))
+        pos_key = (position.yes.qty, position.yes.cost, position.no.qty, position.no.cost)
+        layout["position"].update(self._cached_panel(
+            "position", pos_key,
+            lambda: Panel(self._create_position_table(), title="💼 持仓信息", border_style="green")
+        ))
         
         # Trades Panel
-        trades_table = self._create_trades_table()
-        layout["trades"].update(Panel(trades_table, title="🔄 交易历史", border_style="yellow"))
+        filled_count = len(self.order_manager.filled_orders) if self.order_manager else 0
+        trades_key = (id(self.order_manager), filled_count)
+        layout["trades"].update(self._cached_panel(
+            "trades", trades_key,
+            lambda: Panel(self._create_trades_table(), title="🔄 交易历史", border_style="yellow")
+        ))
         
         # Market Panel
         market_table = self._create_market_table(order_book)
         layout["market"].update(Panel(market_table, title="📊 市场行情", border_style="blue"))
         
         # Parameters Panel
-        params_table = self._create_parameters_table()
-        layout["params"].update(Panel(params_table, title="⚙️  执行参数", border_style="magenta"))
+        has_orderbook = self.current_orderbook is not None
+        params_key = (
+            pair_cost,
+            is_profitable,
+            has_orderbook and position.can_buy("YES", 100, 0.45),
+            has_orderbook and position.can_buy("NO", 100, 0.45)
+        )
+        layout["params"].update(self._cached_panel(
+            "params", params_key,
+            lambda: Panel(self._create_parameters_table(), title="⚙️  执行参数", border_style="magenta")
+        ))
         
         # Logs Panel
-        logs_text = self._create_logs_text()
-        layout["logs"].update(Panel(logs_text, title="📝 实时日志", border_style="dim"))
+        layout["logs"].update(self._cached_panel(
+            "logs", self._logs_version,
+            lambda: Panel(self._create_logs_text(), title="📝 实时日志", border_style="dim")
+        ))
         
         # Footer
-        footer_text = self._create_footer_text()
-        layout["footer"].update(Panel(footer_text, title="⚡ 状态", border_style="yellow"))
+        footer_key = (is_profitable, pair_cost, self.order_manager is not None, filled_count)
+        layout["footer"].update(self._cached_panel(
+            "footer", footer_key,
+            lambda: Panel(self._create_footer_text(), title="⚡ 状态", border_style="yellow")
+        ))
         
         return layout
     
+    def _cached_panel(self, name: str, key: Hashable, build: Callable[[], Panel]) -> Panel:
+        """返回名为 name 的面板；key 与上一帧相同则复用缓存，否则调用 build 重新构建"""
+        cached = self._panel_cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        panel = build()
+        self._panel_cache[name] = (key, panel)
+        return panel
+    
+    def _create_header_panel(self, question: Optional[str]) -> Panel:
+        """创建顶部标题面板"""
+        header_text = Text("📊 15分钟预测市场双边对冲套利 Bot [模拟模式]", style="bold blue")
+        if question:
+            header_text.append(f" | {question[:60]}", style="cyan")
+        return Panel(header_text, border_style="blue")
+    
     def _create_position_table(self) -> Table:
         """创建持仓表格"""
         table = Table(show_header=True, header_style="bold magenta")
@@ -123,7 +214,7 @@ class Dashboard:
             "-"
         )
         
-        pair_cost = self.position.pair_cost
+        pair_cost = self._pair_cost
         table.add_row(
             "配对成本",
             "-",
@@ -134,13 +225,14 @@ class Dashboard:
         
         min_qty = self.position.min_qty
         total_cost = self.position.total_cost
-        profit_status = "✅ 已锁定利润" if self.position.is_profitable() else "⏳ 等待中"
+        is_profitable = self._is_profitable
+        profit_status = "✅ 已锁定利润" if is_profitable else "⏳ 等待中"
         table.add_row(
             "利润状态",
             f"最小持仓: {min_qty:.2f}",
             f"总成本: ${total_cost:.2f}",
             profit_status,
-            style="bold green" if self.position.is_profitable() else "yellow"
+            style="bold green" if is_profitable else "yellow"
         )
         
         imbalance = self.position.get_imbalance_ratio() * 100
@@ -165,13 +257,17 @@ class Dashboard:
         
         yes_mid = order_book.yes_mid_price
         no_mid = order_book.no_mid_price
-        yes_best_ask = order_book.yes_asks[0].price if order_book.yes_asks else 0.0
-        no_best_ask = order_book.no_asks[0].price if order_book.no_asks else 0.0
-        yes_best_bid = order_book.yes_bids[0].price if order_book.yes_bids else 0.0
-        no_best_bid = order_book.no_bids[0].price if order_book.no_bids else 0.0
+        yes_asks, no_asks = order_book.yes_asks, order_book.no_asks
+        yes_bids, no_bids = order_book.yes_bids, order_book.no_bids
+        yes_best_ask = yes_asks[0].price if yes_asks else 0.0
+        no_best_ask = no_asks[0].price if no_asks else 0.0
+        yes_best_bid = yes_bids[0].price if yes_bids else 0.0
+        no_best_bid = no_bids[0].price if no_bids else 0.0
+        
+        entry_min, entry_max = Config.ENTRY_PRICE_MIN, Config.ENTRY_PRICE_MAX
         
         # YES 状态
-        yes_status = "🟢 可买入" if 0.35 <= yes_mid <= 0.50 else "⚪ 等待"
+        yes_status = BUY_STATUS_LABELS[entry_min <= yes_mid <= entry_max]
         table.add_row(
             "YES",
             f"{yes_mid:.4f}",
@@ -181,7 +277,7 @@ class Dashboard:
         )
         
         # NO 状态
-        no_status = "🟢 可买入" if 0.35 <= no_mid <= 0.50 else "⚪ 等待"
+        no_status = BUY_STATUS_LABELS[entry_min <= no_mid <= entry_max]
         table.add_row(
             "NO",
             f"{no_mid:.4f}",
@@ -202,9 +298,8 @@ class Dashboard:
         table.add_column("成本", justify="right", width=10)
         
         if self.order_manager and self.order_manager.filled_orders:
-            # 显示最近10笔交易
-            recent_trades = self.order_manager.filled_orders[-10:]
-            for order in reversed(recent_trades):
+            # 显示最近10笔交易（从尾部倒序取，不复制列表切片）
+            for order in islice(reversed(self.order_manager.filled_orders), 10):
                 time_str = order.timestamp.strftime("%H:%M:%S")
                 side_emoji = "🟢" if order.side == "YES" else "🔴"
                 table.add_row(
@@ -226,7 +321,7 @@ class Dashboard:
         
         if self.trade_logs:
             # 显示最近15条日志
-            for log in self.trade_logs[-15:]:
+            for log in islice(self.trade_logs, max(0, len(self.trade_logs) - 15), None):
                 text.append(log + "\n")
         else:
             text.append("等待交易信号...\n", style="dim")
@@ -238,9 +333,7 @@ class Dashboard:
         timestamp = datetime.now().strftime("%H:%M:%S")
         log_entry = f"[{timestamp}] {message}"
         self.trade_logs.append(log_entry)
-        # 保持最多100条日志
-        if len(self.trade_logs) > 100:
-            self.trade_logs.pop(0)
+        self._logs_version += 1
     
     def _create_footer_text(self) -> Text:
         """创建底部状态文本"""
@@ -250,14 +343,15 @@ class Dashboard:
         text.append("🔶 模拟交易模式 - 不会真实下单", style="bold yellow")
         text.append("\n")
         
-        if self.position.is_profitable():
+        if self._is_profitable:
             text.append("✅ 利润已锁定！停止买入，等待结算", style="bold green")
         else:
             text.append("⏳ 持续监控中...", style="yellow")
         
         text.append("\n")
-        text.append(f"配对成本: {self.position.pair_cost:.4f} ", style="cyan")
-        if self.position.pair_cost < 0.98:
+        pair_cost = self._pair_cost
+        text.append(f"配对成本: {pair_cost:.4f} ", style="cyan")
+        if pair_cost < 0.98:
             text.append("(安全)", style="green")
         else:
             text.append("(风险)", style="red")
@@ -277,60 +371,60 @@ class Dashboard:
         current_no = order_book.no_mid_price
         
         # 只有当价格变化时才添加新点（避免重复）
-        if not self.price_history or \
-           self.price_history[-1]["yes"] != current_yes or \
-           self.price_history[-1]["no"] != current_no:
+        current_price = (current_yes, current_no)
+        if self._last_price != current_price:
+            self._last_price = current_price
+            # deque 满时自动淘汰最旧的点（保持最近 PRICE_HISTORY_SIZE 个）
             self.price_history.append({
                 "time": timestamp,
                 "yes": current_yes,
                 "no": current_no
             })
-        
-        # 保持最近30个数据点
-        if len(self.price_history) > 30:
-            self.price_history.pop(0)
+            seq = self._price_seq
+            self._price_seq += 1
+            _push_window(self._yes_min, seq, current_yes, operator.ge)
+            _push_window(self._yes_max, seq, current_yes, operator.le)
+            _push_window(self._no_min, seq, current_no, operator.ge)
+            _push_window(self._no_max, seq, current_no, operator.le)
         
         if len(self.price_history) < 2:
             return Text("等待数据...", style="dim")
         
         # 创建简单的 ASCII 图表
         text = Text()
+        first, prev, last = self.price_history[0], self.price_history[-2], self.price_history[-1]
         
         # YES 价格
-        yes_prices = [p["yes"] for p in self.price_history]
-        yes_min, yes_max = min(yes_prices), max(yes_prices)
-        yes_range = yes_max - yes_min if yes_max != yes_min else 0.01
+        yes_min, yes_max = self._yes_min[0][1], self._yes_max[0][1]
         
         text.append("YES: ", style="green bold")
-        if len(yes_prices) >= 2:
+        if len(self.price_history) >= 2:
             # 简单的趋势指示
-            if yes_prices[-1] > yes_prices[-2]:
+            if last["yes"] > prev["yes"]:
                 text.append("📈 ", style="green")
-            elif yes_prices[-1] < yes_prices[-2]:
+            elif last["yes"] < prev["yes"]:
                 text.append("📉 ", style="red")
             else:
                 text.append("➡️  ", style="yellow")
-        text.append(f"${order_book.yes_mid_price:.4f}", style="green")
+        text.append(f"${current_yes:.4f}", style="green")
         text.append(f" (范围: ${yes_min:.4f} - ${yes_max:.4f})\n", style="dim")
         
         # NO 价格
-        no_prices = [p["no"] for p in self.price_history]
-        no_min, no_max = min(no_prices), max(no_prices)
-        no_range = no_max - no_min if no_max != no_min else 0.01
+        no_min, no_max = self._no_min[0][1], self._no_max[0][1]
         
         text.append("NO:  ", style="red bold")
-        if len(no_prices) >= 2:
-            if no_prices[-1] > no_prices[-2]:
+        if len(self.price_history) >= 2:
+            if last["no"] > prev["no"]:
                 text.append("📈 ", style="green")
-            elif no_prices[-1] < no_prices[-2]:
+            elif last["no"] < prev["no"]:
                 text.append("📉 ", style="red")
             else:
                 text.append("➡️  ", style="yellow")
-        text.append(f"${order_book.no_mid_price:.4f}", style="red")
+        text.append(f"${current_no:.4f}", style="red")
         text.append(f" (范围: ${no_min:.4f} - ${no_max:.4f})\n", style="dim")
         
         # 配对成本
-        pair_cost = self.position.pair_cost
+        pair_cost = self._pair_cost
         text.append("\n配对成本: ", style="cyan")
         text.append(f"${pair_cost:.4f}", style="bold cyan")
         if pair_cost < 0.98:
@@ -340,8 +434,8 @@ class Dashboard:
         
         # 价格变化百分比
         if len(self.price_history) >= 2:
-            yes_change = ((yes_prices[-1] - yes_prices[0]) / yes_prices[0]) * 100 if yes_prices[0] > 0 else 0
-            no_change = ((no_prices[-1] - no_prices[0]) / no_prices[0]) * 100 if no_prices[0] > 0 else 0
+            yes_change = ((last["yes"] - first["yes"]) / first["yes"]) * 100 if first["yes"] > 0 else 0
+            no_change = ((last["no"] - first["no"]) / first["no"]) * 100 if first["no"] > 0 else 0
             
             text.append(f"\n\n变化: YES {yes_change:+.2f}% | NO {no_change:+.2f}%", style="dim")
         
@@ -353,8 +447,6 @@ class Dashboard:
         table.add_column("参数", style="cyan", width=20)
         table.add_column("值", justify="right", width=15)
         
-        from config import Config
-        
         # 准入条件
         entry_min = Config.ENTRY_PRICE_MIN
         entry_max = Config.ENTRY_PRICE_MAX
@@ -371,7 +463,7 @@ class Dashboard:
         table.add_row("不平衡阈值", f"{imbalance_threshold:.0f}%")
         
         # 准入判定
-        pair_cost = self.position.pair_cost
+        pair_cost = self._pair_cost
         can_buy_yes = self.position.can_buy("YES", 100, 0.45) if self.current_orderbook else False
         can_buy_no = self.position.can_buy("NO", 100, 0.45) if self.current_orderbook else False
         
@@ -381,7 +473,7 @@ class Dashboard:
         table.add_row("NO 可买入", "✅" if can_buy_no else "❌")
         
         # 利润锁定
-        is_profitable = self.position.is_profitable()
+        is_profitable = self._is_profitable
         table.add_row("利润锁定状态", "✅ 已锁定" if is_profitable else "⏳ 未锁定")
         
         return table
@@ -3,22 +3,85 @@
 新逻辑：搜索市场 → 获取所有交易 → 标记目标地址
 """
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit.components.v1 as components
 from plotly.subplots import make_subplots
 from datetime import datetime
-from typing import List, Dict, Optional, Set
+from operator import attrgetter
+from typing import List, Dict, Optional, FrozenSet, Tuple
 import asyncio
+import io
 
 from ..market.market_searcher import MarketSearcher, MarketInfo
 from ..market.address_tracker import AddressTracker, Trade
+from .address_tracking_charts import timestamps_to_datetime, use_density_view, volume_bin_freq, wallet_mask
+
+# 统计用字段：attrgetter 一次取出多个属性，避免在生成器中逐个点号访问
+_STATS_FIELDS = attrgetter('price', 'value', 'side', 'timestamp', 'proxy_wallet')
+_STATS_DTYPE = [('price', 'f8'), ('value', 'f8'), ('side', 'U4'), ('timestamp', 'i8'), ('proxy_wallet', 'O')]
+
+# 所有交易图表的高度（像素）
+CHART_HEIGHT = 800
+
+# 图表数据框的逐笔字段
+_CHART_FIELDS = attrgetter('price', 'size', 'side', 'proxy_wallet')
+
+# 导出 CSV 需要的其余字段
+_EXPORT_FIELDS = attrgetter('size', 'title', 'slug')
+
+# 市场链接前缀（与 Trade.market_url 一致）
+MARKET_URL_PREFIX = "https://polymarket.com/event/"
+
+# 交易类型样式（散点与柱状图共用），按 (是否卖出 << 1) | 是否NO 索引：买入YES、买入NO、卖出YES、卖出NO
+_TRADE_TYPE_LABELS = np.array(['买入 YES', '买入 NO', '卖出 YES', '卖出 NO'])
+_TRADE_TYPE_TRACKED_LABELS = np.array([f'⭐ {label} (目标)' for label in _TRADE_TYPE_LABELS])
+_TRADE_TYPE_COLORS = np.array(['#00CC00', '#90EE90', '#FF0000', '#FFB6C1'])  # 亮绿、浅绿、红、粉红
+_TRADE_TYPE_SYMBOLS = np.array(['triangle-up', 'circle', 'triangle-down', 'square'])
+
+
+def trades_to_stats_array(trades: List[Trade]) -> np.ndarray:
+    """将交易列表批量提取为结构化数组（price / value / side / timestamp / proxy_wallet），统计时按列向量化计算"""
+    return np.array(list(map(_STATS_FIELDS, trades)), dtype=_STATS_DTYPE)
+
+
+def _get_wallet_stats(
+    stats_arr: np.ndarray,
+    tracked_wallets: Optional[FrozenSet[str]]
+) -> Tuple[pd.Categorical, np.ndarray]:
+    """
+    返回钱包 Categorical（类别数即交易者数）和目标地址掩码
+    
+    两者只依赖统计数组和目标钱包集合（frozenset 可直接比较），缓存在 session state 中，
+    数据和目标地址都未变化的重跑不再对全部钱包重新编码
+    """
+    cached = st.session_state.get('_wallet_stats')
+    if cached is None or cached[0] is not stats_arr or cached[1] != tracked_wallets:
+        wallets = pd.Categorical(stats_arr['proxy_wallet'])
+        cached = (stats_arr, tracked_wallets, wallets, wallet_mask(wallets, tracked_wallets))
+        st.session_state._wallet_stats = cached
+    return cached[2], cached[3]
+
+
+def _classify_trades(price_arr: np.ndarray, side_arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    整列计算每笔交易的类型索引：(是否卖出 << 1) | 是否NO，即 买入YES=0、买入NO=1、卖出YES=2、卖出NO=3
+    
+    价格 > 0.5 的是 YES，<= 0.5 的是 NO。返回 (类型索引 int8, 方向是否为 BUY/SELL)
+    """
+    is_buy = side_arr == 'BUY'
+    is_valid = is_buy | (side_arr == 'SELL')
+    type_idx = ((~is_buy).astype(np.int8) << 1) | (price_arr <= 0.5).astype(np.int8)
+    return type_idx, is_valid
 
 
 def create_all_trades_chart_with_highlight(
     all_trades: List[Trade],
     market_title: str,
     tracked_address: Optional[str] = None,
-    tracked_proxy_wallets: Optional[Set[str]] = None
+    tracked_proxy_wallets: Optional[FrozenSet[str]] = None
 ):
     """
     创建市场所有交易图表，高亮显示目标地址的交易
@@ -33,22 +96,59 @@ def create_all_trades_chart_with_highlight(
         st.warning("没有交易数据")
         return
     
-    # 创建数据框
-    df = pd.DataFrame([
-        {
-            'time': datetime.fromtimestamp(t.timestamp),
-            'price': t.price,
-            'size': t.size,
-            'side': t.side,
-            'value': t.value,
-            'proxy_wallet': t.proxy_wallet,
-            'is_tracked': tracked_proxy_wallets is not None and t.proxy_wallet in tracked_proxy_wallets
-        }
-        for t in all_trades
-    ])
-    
-    # 判断 YES/NO
-    df['outcome'] = df['price'].apply(lambda p: 'YES' if p > 0.5 else 'NO')
+    # 图表按 (交易数, 首尾时间戳, 标题, 目标钱包) 缓存在 session state 中：
+    # 构建后立即序列化为 HTML（plotly.io 会在安装了 orjson 时自动使用它），
+    # 数据未变化的重跑（如修改输入框、展开统计）直接复用序列化结果，不再重新编码整张图
+    figure_key = (len(all_trades), all_trades[0].timestamp, all_trades[-1].timestamp, market_title, tracked_proxy_wallets)
+    cached = st.session_state.get('_all_trades_chart_html')
+    if cached is None or cached[0] != figure_key:
+        fig = _build_all_trades_figure(all_trades, market_title, tracked_proxy_wallets)
+        html = pio.to_html(
+            fig,
+            include_plotlyjs='cdn',
+            full_html=False,
+            validate=False,
+            config={'responsive': True}
+        )
+        # 是否有需要高亮的交易（只在重新构建时计算一次，随图表一起缓存）
+        has_tracked = bool(tracked_proxy_wallets) and any(
+            t.proxy_wallet in tracked_proxy_wallets for t in all_trades
+        )
+        cached = (figure_key, html, has_tracked)
+        st.session_state._all_trades_chart_html = cached
+    
+    if use_density_view(len(all_trades)):
+        highlight_note = "，⭐ 目标地址的交易仍以散点标记" if cached[2] else ""
+        st.info(f"ℹ️ 该市场共 {len(all_trades):,} 笔交易，其他交易以密度图显示{highlight_note}")
+    
+    components.html(cached[1], height=CHART_HEIGHT + 20)
+
+
+def _build_all_trades_figure(
+    all_trades: List[Trade],
+    market_title: str,
+    tracked_proxy_wallets: Optional[FrozenSet[str]] = None
+) -> go.Figure:
+    """构建所有交易图表（价格散点 + 数量柱状图），目标地址的交易高亮显示"""
+    # 创建数据框：按列一次性提取，时间、金额、标记均整列计算（不再为每笔交易构造 dict 和 datetime）
+    prices, sizes, sides, wallets = zip(*map(_CHART_FIELDS, all_trades))
+    price_arr = np.asarray(prices, dtype=np.float64)
+    size_arr = np.asarray(sizes, dtype=np.float64)
+    side_arr = np.asarray(sides, dtype=object)
+    wallet_cat = pd.Categorical(wallets)
+    
+    df = pd.DataFrame({
+        'time': timestamps_to_datetime(all_trades),
+        'price': price_arr,
+        'size': size_arr,
+        'side': side_arr,
+        'value': size_arr * price_arr,
+        'proxy_wallet': wallet_cat,
+        'is_tracked': wallet_mask(wallet_cat, tracked_proxy_wallets)
+    })
+    
+    # 交易类型（买卖 × YES/NO）只分类一次，散点和柱状图共用
+    style_idx, is_valid = _classify_trades(price_arr, side_arr)
     
     # 创建图表
     fig = make_subplots(
@@ -58,263 +158,123 @@ def create_all_trades_chart_with_highlight(
         row_heights=[0.65, 0.35]
     )
     
-    # 分离交易类型
-    buy_yes = df[(df['side'] == 'BUY') & (df['outcome'] == 'YES')]
-    buy_no = df[(df['side'] == 'BUY') & (df['outcome'] == 'NO')]
-    sell_yes = df[(df['side'] == 'SELL') & (df['outcome'] == 'YES')]
-    sell_no = df[(df['side'] == 'SELL') & (df['outcome'] == 'NO')]
-    
-    # 分别添加四种交易类型到图表（买入YES、买入NO、卖出YES、卖出NO）
-    
-    # 1. 买入 YES
-    if not buy_yes.empty:
-        others = buy_yes[~buy_yes['is_tracked']]
-        tracked = buy_yes[buy_yes['is_tracked']]
-        
-        # 其他人的买入YES
-        if not others.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=others['time'],
-                    y=others['price'],
-                    mode='markers',  # 只有散点，没有线
-                    name='买入 YES',
-                    marker=dict(
-                        size=8,
-                        color='#00CC00',  # 亮绿色
-                        symbol='triangle-up',
-                        opacity=0.4,
-                        line=dict(width=0)  # 无边框
-                    ),
-                    text=[f"<b>买入 YES</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(others['size'], others['price'], others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
-        
-        # 目标地址的买入YES
-        if not tracked.empty:
+    # 交易量过大时，其他用户的交易改用二维直方图作为背景（只下发分桶计数，而非每笔交易的坐标），
+    # 目标地址的交易仍逐笔以散点标出
+    use_density = use_density_view(len(df))
+    if use_density:
+        others_df = df[~df['is_tracked']]
+        if not others_df.empty:
             fig.add_trace(
-                go.Scatter(
-                    x=tracked['time'],
-                    y=tracked['price'],
-                    mode='markers',
-                    name='⭐ 买入 YES (目标)',
-                    marker=dict(
-                        size=14,
-                        color='#00CC00',
-                        symbol='triangle-up',
-                        opacity=1.0,
-                        line=dict(width=2, color='black')
-                    ),
-                    text=[f"<b>⭐ 买入 YES (目标)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(tracked['size'], tracked['price'], tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
+                go.Histogram2d(
+                    x=others_df['time'],
+                    y=others_df['price'],
+                    nbinsx=200,
+                    nbinsy=50,
+                    colorscale='Greys',
+                    showscale=False,
+                    name='其他交易密度',
+                    hovertemplate='时间: %{x}<br>价格: %{y}<br>交易数: %{z}<extra></extra>'
                 ),
                 row=1, col=1
             )
     
-    # 2. 买入 NO
-    if not buy_no.empty:
-        others = buy_no[~buy_no['is_tracked']]
-        tracked = buy_no[buy_no['is_tracked']]
-        
-        # 其他人的买入NO
-        if not others.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=others['time'],
-                    y=others['price'],
-                    mode='markers',
-                    name='买入 NO',
-                    marker=dict(
-                        size=8,
-                        color='#90EE90',  # 浅绿色
-                        symbol='circle',
-                        opacity=0.4,
-                        line=dict(width=0)
-                    ),
-                    text=[f"<b>买入 NO</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(others['size'], others['price'], others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
-        
-        # 目标地址的买入NO
-        if not tracked.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=tracked['time'],
-                    y=tracked['price'],
-                    mode='markers',
-                    name='⭐ 买入 NO (目标)',
-                    marker=dict(
-                        size=14,
-                        color='#90EE90',
-                        symbol='circle',
-                        opacity=1.0,
-                        line=dict(width=2, color='black')
-                    ),
-                    text=[f"<b>⭐ 买入 NO (目标)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(tracked['size'], tracked['price'], tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
+    # 价格散点：其他交易与目标地址交易各一条 trace，四种类型（买入YES、买入NO、卖出YES、卖出NO）
+    # 通过逐点的颜色/符号数组区分，而不是每种类型单独一条 trace
+    point_colors = _TRADE_TYPE_COLORS[style_idx]
+    point_symbols = _TRADE_TYPE_SYMBOLS[style_idx]
     
-    # 3. 卖出 YES
-    if not sell_yes.empty:
-        others = sell_yes[~sell_yes['is_tracked']]
-        tracked = sell_yes[sell_yes['is_tracked']]
+    time_arr = df['time'].to_numpy()
+    value_arr = df['value'].to_numpy()
+    tracked_arr = df['is_tracked'].to_numpy().astype(bool)
+    
+    for is_tracked, name, marker_size, opacity, line in [
+        # 其他人的交易：半透明、无边框
+        (False, '其他交易', 8, 0.4, dict(width=0)),
+        # 目标地址的交易：放大、不透明、黑色边框
+        (True, '⭐ 目标地址交易', 14, 1.0, dict(width=2, color='black')),
+    ]:
+        if use_density and not is_tracked:
+            continue
+        mask = is_valid & (tracked_arr if is_tracked else ~tracked_arr)
+        if not mask.any():
+            continue
         
-        # 其他人的卖出YES
-        if not others.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=others['time'],
-                    y=others['price'],
-                    mode='markers',
-                    name='卖出 YES',
-                    marker=dict(
-                        size=8,
-                        color='#FF0000',  # 红色
-                        symbol='triangle-down',
-                        opacity=0.4,
-                        line=dict(width=0)
-                    ),
-                    text=[f"<b>卖出 YES</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(others['size'], others['price'], others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
-                ),
-                row=1, col=1
-            )
+        # 悬停标题按类型索引查表（4 个固定字符串），数值字段放入 customdata 由前端格式化
+        type_labels = _TRADE_TYPE_TRACKED_LABELS if is_tracked else _TRADE_TYPE_LABELS
+        labels = type_labels[style_idx[mask]]
         
-        # 目标地址的卖出YES
-        if not tracked.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=tracked['time'],
-                    y=tracked['price'],
-                    mode='markers',
-                    name='⭐ 卖出 YES (目标)',
-                    marker=dict(
-                        size=14,
-                        color='#FF0000',
-                        symbol='triangle-down',
-                        opacity=1.0,
-                        line=dict(width=2, color='black')
-                    ),
-                    text=[f"<b>⭐ 卖出 YES (目标)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(tracked['size'], tracked['price'], tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
+        # Scattergl 用 WebGL 一次绘制全部点，点数多时比 SVG 散点快得多
+        fig.add_trace(
+            go.Scattergl(
+                x=time_arr[mask],
+                y=price_arr[mask],
+                mode='markers',  # 只有散点，没有线
+                name=name,
+                marker=dict(
+                    size=marker_size,
+                    color=point_colors[mask],
+                    symbol=point_symbols[mask],
+                    opacity=opacity,
+                    line=line
                 ),
-                row=1, col=1
-            )
+                text=labels,
+                # 价格直接取 y，不在 customdata 中重复；数量/金额按显示精度取整，缩短序列化后的数字
+                customdata=np.column_stack([size_arr[mask], value_arr[mask]]).round(2),
+                hovertemplate='<b>%{text}</b><br>数量: %{customdata[0]:.0f} shares<br>价格: $%{y:.3f}<br>金额: $%{customdata[1]:.2f}<br>时间: %{x}<extra></extra>',
+                showlegend=True
+            ),
+            row=1, col=1
+        )
     
-    # 4. 卖出 NO
-    if not sell_no.empty:
-        others = sell_no[~sell_no['is_tracked']]
-        tracked = sell_no[sell_no['is_tracked']]
+    # 添加数量图（柱状图）：按 (交易类型, 是否目标地址) 一次分组，
+    # 其他交易按时间分桶汇总（避免每笔交易一根柱子），目标地址的交易逐笔显示
+    bin_freq = volume_bin_freq((df['time'].max() - df['time'].min()).total_seconds())
+    bar_df = pd.DataFrame({
+        'time': time_arr,
+        'size': size_arr,
+        'style': style_idx,
+        'tracked': tracked_arr
+    })[is_valid]
+    
+    for (style, is_tracked), group in bar_df.groupby(['style', 'tracked'], sort=True):
+        name = _TRADE_TYPE_LABELS[style]
+        color = _TRADE_TYPE_COLORS[style]
         
-        # 其他人的卖出NO
-        if not others.empty:
+        if is_tracked:
             fig.add_trace(
-                go.Scatter(
-                    x=others['time'],
-                    y=others['price'],
-                    mode='markers',
-                    name='卖出 NO',
-                    marker=dict(
-                        size=8,
-                        color='#FFB6C1',  # 粉红色
-                        symbol='square',
-                        opacity=0.4,
-                        line=dict(width=0)
-                    ),
-                    text=[f"<b>卖出 NO</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(others['size'], others['price'], others['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
+                go.Bar(
+                    x=group['time'].to_numpy(),
+                    y=group['size'].to_numpy(),
+                    name=f'⭐ {name} (目标)',
+                    marker=dict(color=color, opacity=1.0, line=dict(width=1, color='black')),
+                    showlegend=False,
+                    hovertemplate=f'⭐ {name}<br>数量: %{{y:.0f}}<br>时间: %{{x}}<extra></extra>'
                 ),
-                row=1, col=1
+                row=2, col=1
             )
-        
-        # 目标地址的卖出NO
-        if not tracked.empty:
+        else:
+            binned = group.set_index('time')['size'].resample(bin_freq).sum()
+            binned = binned[binned > 0]
             fig.add_trace(
-                go.Scatter(
-                    x=tracked['time'],
-                    y=tracked['price'],
-                    mode='markers',
-                    name='⭐ 卖出 NO (目标)',
-                    marker=dict(
-                        size=14,
-                        color='#FFB6C1',
-                        symbol='square',
-                        opacity=1.0,
-                        line=dict(width=2, color='black')
-                    ),
-                    text=[f"<b>⭐ 卖出 NO (目标)</b><br>数量: {s:.0f} shares<br>价格: ${p:.3f}<br>金额: ${v:.2f}" 
-                          for s, p, v in zip(tracked['size'], tracked['price'], tracked['value'])],
-                    hovertemplate='%{text}<br>时间: %{x}<extra></extra>',
-                    showlegend=True
+                go.Bar(
+                    x=binned.index,
+                    y=binned.to_numpy(),
+                    name=name,
+                    marker=dict(color=color, opacity=0.4),
+                    showlegend=False,
+                    hovertemplate=f'{name}<br>数量: %{{y:.0f}}<br>时间: %{{x}}<extra></extra>'
                 ),
-                row=1, col=1
+                row=2, col=1
             )
     
-    # 添加数量图（柱状图）
-    for trade_type, trade_df, color, name in [
-        ('buy_yes', buy_yes, '#00CC00', '买入 YES'),
-        ('buy_no', buy_no, '#90EE90', '买入 NO'),
-        ('sell_yes', sell_yes, '#FF0000', '卖出 YES'),
-        ('sell_no', sell_no, '#FFB6C1', '卖出 NO'),
-    ]:
-        if not trade_df.empty:
-            others = trade_df[~trade_df['is_tracked']]
-            tracked = trade_df[trade_df['is_tracked']]
-            
-            if not others.empty:
-                fig.add_trace(
-                    go.Bar(
-                        x=others['time'],
-                        y=others['size'],
-                        name=name,
-                        marker=dict(color=color, opacity=0.4),
-                        showlegend=False,
-                        hovertemplate=f'{name}<br>数量: %{{y:.0f}}<br>时间: %{{x}}<extra></extra>'
-                    ),
-                    row=2, col=1
-                )
-            
-            if not tracked.empty:
-                fig.add_trace(
-                    go.Bar(
-                        x=tracked['time'],
-                        y=tracked['size'],
-                        name=f'⭐ {name} (目标)',
-                        marker=dict(color=color, opacity=1.0, line=dict(width=1, color='black')),
-                        showlegend=False,
-                        hovertemplate=f'⭐ {name}<br>数量: %{{y:.0f}}<br>时间: %{{x}}<extra></extra>'
-                    ),
-                    row=2, col=1
-                )
-    
     # 更新布局
     fig.update_layout(
         title=dict(
-            text=f"{market_title}<br><sub>所有交易（⭐ 高亮标记目标地址）</sub>",
+            text=f"{market_title}<br><sub>所有交易（⭐ 高亮标记目标地址）｜▲ 买入YES ● 买入NO ▼ 卖出YES ■ 卖出NO</sub>",
             x=0.5,
             xanchor='center'
         ),
-        height=800,
+        height=CHART_HEIGHT,
         hovermode='closest',
         showlegend=True,
         legend=dict(
@@ -331,7 +291,11 @@ def create_all_trades_chart_with_highlight(
     fig.update_yaxes(title_text="价格 ($)", row=1, col=1)
     fig.update_yaxes(title_text="数量 (shares)", row=2, col=1)
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+
+# st.fragment 需要较新的 Streamlit（旧版本为 experimental_fragment），都不可用时退化为普通函数
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
 
 
 def display_market_analysis():
@@ -528,35 +492,36 @@ def display_market_analysis():
         st.caption("💡 输入地址后点击按钮，系统会获取该市场的所有交易，并高亮标记目标地址的交易")
         
         if fetch_button:
-            with st.spinner("正在获取市场所有交易..."):
-                # 获取所有交易
-                async def fetch_all_trades():
+            has_target = bool(target_address and target_address.startswith("0x"))
+            spinner_text = "正在获取市场所有交易和目标地址的代理钱包..." if has_target else "正在获取市场所有交易..."
+            with st.spinner(spinner_text):
+                # 市场交易与目标地址的代理钱包互不依赖，在同一事件循环中并发获取
+                async def fetch_trades_and_wallets():
                     async with AddressTracker() as tracker:
-                        return await tracker.get_all_market_trades(
+                        trades_coro = tracker.get_all_market_trades(
                             selected_market.condition_id,
                             max_trades=None,  # 获取全部
                             batch_size=1000
                         )
+                        if not has_target:
+                            return await trades_coro, None
+                        
+                        trades, address_trades = await asyncio.gather(
+                            trades_coro,
+                            tracker.get_address_trades(target_address, limit=100)
+                        )
+                        analysis = tracker.analyze_trades(address_trades)
+                        return trades, frozenset(analysis.get('proxy_wallets', ()))
                 
-                all_trades = asyncio.run(fetch_all_trades())
+                all_trades, tracked_wallets = asyncio.run(fetch_trades_and_wallets())
                 
                 if all_trades:
                     st.session_state.all_trades = all_trades
+                    # 统计用数组只在获取数据时构建一次，之后的重跑直接复用
+                    st.session_state.stats_arr = trades_to_stats_array(all_trades)
                     st.session_state.selected_market = selected_market
                     st.session_state.target_address = target_address
-                    
-                    # 如果有目标地址，获取其代理钱包
-                    tracked_wallets = None
-                    if target_address and target_address.startswith("0x"):
-                        with st.spinner("正在获取目标地址的代理钱包..."):
-                            async def get_proxy_wallets():
-                                async with AddressTracker() as tracker:
-                                    trades = await tracker.get_address_trades(target_address, limit=100)
-                                    analysis = tracker.analyze_trades(trades)
-                                    return set(analysis['proxy_wallets'])
-                            
-                            tracked_wallets = asyncio.run(get_proxy_wallets())
-                            st.session_state.tracked_wallets = tracked_wallets
+                    st.session_state.tracked_wallets = tracked_wallets
                     
                     st.success(f"✓ 获取到 {len(all_trades):,} 笔交易")
                 else:
@@ -564,148 +529,175 @@ def display_market_analysis():
         
         # 步骤4: 显示分析结果
         if 'all_trades' in st.session_state and st.session_state.all_trades:
-            st.markdown("---")
-            st.subheader("📊 步骤4: 交易分析")
-            
-            all_trades = st.session_state.all_trades
-            selected_market = st.session_state.selected_market
-            target_address = st.session_state.target_address
-            tracked_wallets = st.session_state.get('tracked_wallets', None)
-            
-            # 统计信息
-            all_traders = set(t.proxy_wallet for t in all_trades)
-            buy_count = len([t for t in all_trades if t.side == 'BUY'])
-            sell_count = len([t for t in all_trades if t.side == 'SELL'])
-            
-            # 统计目标地址的交易
-            target_trades_count = 0
-            if tracked_wallets:
-                target_trades_count = len([t for t in all_trades if t.proxy_wallet in tracked_wallets])
-            
-            # 显示统计
-            col1, col2, col3, col4, col5 = st.columns(5)
-            with col1:
-                st.metric("总交易数", f"{len(all_trades):,}")
-            with col2:
-                st.metric("交易者数", len(all_traders))
-            with col3:
-                st.metric("买入交易", buy_count)
-            with col4:
-                st.metric("卖出交易", sell_count)
-            with col5:
-                if target_trades_count > 0:
-                    st.metric("⭐ 目标地址", target_trades_count)
-                else:
-                    st.metric("目标地址", "未输入")
-            
-            # 显示目标地址信息
-            if tracked_wallets and target_trades_count > 0:
-                st.success(f"✓ 在 {len(all_trades):,} 笔交易中找到目标地址的 {target_trades_count} 笔交易")
-                
-                with st.expander("🎯 目标地址信息", expanded=False):
-                    st.markdown(f"""
-                    **主地址**: `{target_address}`
-                    
-                    **关联的代理钱包** ({len(tracked_wallets)} 个):
-                    """)
-                    for wallet in tracked_wallets:
-                        st.code(wallet, language=None)
-            elif target_address and target_address.startswith("0x"):
-                st.info("ℹ️ 该地址在此市场没有交易记录")
-            
-            # 详细统计
-            with st.expander("📊 市场交易详细统计", expanded=False):
-                # 价格统计
-                prices = [t.price for t in all_trades]
-                st.markdown(f"""
-                **价格统计**：
-                - 最低价：${min(prices):.3f}
-                - 最高价：${max(prices):.3f}
-                - 平均价：${sum(prices)/len(prices):.3f}
-                """)
-                
-                # 交易量统计
-                total_volume = sum(t.value for t in all_trades)
-                buy_volume = sum(t.value for t in all_trades if t.side == 'BUY')
-                sell_volume = sum(t.value for t in all_trades if t.side == 'SELL')
-                
-                st.markdown(f"""
-                **交易量统计**：
-                - 总交易额：${total_volume:,.2f}
-                - 买入总额：${buy_volume:,.2f}
-                - 卖出总额：${sell_volume:,.2f}
-                """)
-                
-                # 时间范围
-                timestamps = [t.timestamp for t in all_trades]
-                start_time = datetime.fromtimestamp(min(timestamps))
-                end_time = datetime.fromtimestamp(max(timestamps))
-                duration = (max(timestamps) - min(timestamps)) // 60
-                
-                st.markdown(f"""
-                **时间范围**：
-                - 开始：{start_time.strftime('%Y-%m-%d %H:%M:%S')}
-                - 结束：{end_time.strftime('%Y-%m-%d %H:%M:%S')}
-                - 持续：{duration:.0f} 分钟
-                """)
-                
-                # 目标地址统计
-                if tracked_wallets and target_trades_count > 0:
-                    target_trades = [t for t in all_trades if t.proxy_wallet in tracked_wallets]
-                    target_buy = len([t for t in target_trades if t.side == 'BUY'])
-                    target_sell = len([t for t in target_trades if t.side == 'SELL'])
-                    target_volume = sum(t.value for t in target_trades)
-                    
-                    st.markdown(f"""
-                    **目标地址统计**：
-                    - 总交易：{target_trades_count} 笔
-                    - 买入：{target_buy} 笔
-                    - 卖出：{target_sell} 笔
-                    - 交易额：${target_volume:,.2f}
-                    - 占比：{target_trades_count/len(all_trades)*100:.2f}%
-                    """)
-            
-            # 图表
-            st.markdown("---")
-            st.subheader("📈 交易时间序列")
-            
-            create_all_trades_chart_with_highlight(
-                all_trades,
-                selected_market.question,
-                target_address,
-                tracked_wallets
-            )
-            
-            # 导出功能
-            st.markdown("---")
-            st.subheader("📥 导出数据")
-            
-            export_data = []
-            for t in all_trades:
-                is_target = tracked_wallets is not None and t.proxy_wallet in tracked_wallets
-                export_data.append({
-                    '时间': datetime.fromtimestamp(t.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
-                    '方向': t.side,
-                    '价格': t.price,
-                    '数量': t.size,
-                    '金额': t.value,
-                    '是否为目标地址': '⭐ 是' if is_target else '否',
-                    '钱包地址': t.proxy_wallet,
-                    '市场标题': t.title,
-                    '市场链接': t.market_url
-                })
+            display_trade_analysis()
+
+
+@_fragment
+def display_trade_analysis():
+    """
+    显示步骤4：交易分析（统计、图表、导出）
+    
+    作为 fragment 运行：区域内的交互（如下载 CSV）只重跑这一部分，不会重跑搜索和选择市场的步骤
+    """
+    st.markdown("---")
+    st.subheader("📊 步骤4: 交易分析")
+    
+    all_trades = st.session_state.all_trades
+    selected_market = st.session_state.selected_market
+    target_address = st.session_state.target_address
+    tracked_wallets = st.session_state.get('tracked_wallets', None)
+    
+    # 统计信息（全部基于一次提取的列数组计算，不再多次遍历交易列表）
+    stats_arr = st.session_state.get('stats_arr')
+    if stats_arr is None:
+        stats_arr = st.session_state.stats_arr = trades_to_stats_array(all_trades)
+    sides = stats_arr['side']
+    values = stats_arr['value']
+    # 钱包 Categorical 与目标地址掩码按 (统计数组, 目标钱包集合) 缓存，重跑时直接复用
+    wallets, target_mask = _get_wallet_stats(stats_arr, tracked_wallets)
+    trader_count = len(wallets.categories)
+    # 按方向一次分组，同时得到笔数和金额（详细统计中复用）
+    side_stats = (
+        pd.Series(values).groupby(sides).agg(['size', 'sum'])
+        .reindex(['BUY', 'SELL'], fill_value=0)
+    )
+    buy_count = int(side_stats.at['BUY', 'size'])
+    sell_count = int(side_stats.at['SELL', 'size'])
+    
+    # 统计目标地址的交易（掩码在详细统计中复用）
+    target_trades_count = int(target_mask.sum())
+    
+    # 显示统计
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("总交易数", f"{len(all_trades):,}")
+    with col2:
+        st.metric("交易者数", trader_count)
+    with col3:
+        st.metric("买入交易", buy_count)
+    with col4:
+        st.metric("卖出交易", sell_count)
+    with col5:
+        if target_trades_count > 0:
+            st.metric("⭐ 目标地址", target_trades_count)
+        else:
+            st.metric("目标地址", "未输入")
+    
+    # 显示目标地址信息
+    if tracked_wallets and target_trades_count > 0:
+        st.success(f"✓ 在 {len(all_trades):,} 笔交易中找到目标地址的 {target_trades_count} 笔交易")
+        
+        with st.expander("🎯 目标地址信息", expanded=False):
+            st.markdown(f"""
+            **主地址**: `{target_address}`
             
-            df_export = pd.DataFrame(export_data)
-            csv = df_export.to_csv(index=False).encode('utf-8-sig')
+            **关联的代理钱包** ({len(tracked_wallets)} 个):
+            """)
+            for wallet in tracked_wallets:
+                st.code(wallet, language=None)
+    elif target_address and target_address.startswith("0x"):
+        st.info("ℹ️ 该地址在此市场没有交易记录")
+    
+    # 详细统计
+    with st.expander("📊 市场交易详细统计", expanded=False):
+        # 价格、金额、时间统计一次聚合完成
+        agg = pd.DataFrame({
+            'price': stats_arr['price'],
+            'value': values,
+            'timestamp': stats_arr['timestamp']
+        }).agg({'price': ['min', 'max', 'mean'], 'value': 'sum', 'timestamp': ['min', 'max']})
+        
+        # 价格统计
+        st.markdown(f"""
+        **价格统计**：
+        - 最低价：${agg.at['min', 'price']:.3f}
+        - 最高价：${agg.at['max', 'price']:.3f}
+        - 平均价：${agg.at['mean', 'price']:.3f}
+        """)
+        
+        # 交易量统计
+        total_volume = agg.at['sum', 'value']
+        buy_volume = side_stats.at['BUY', 'sum']
+        sell_volume = side_stats.at['SELL', 'sum']
+        
+        st.markdown(f"""
+        **交易量统计**：
+        - 总交易额：${total_volume:,.2f}
+        - 买入总额：${buy_volume:,.2f}
+        - 卖出总额：${sell_volume:,.2f}
+        """)
+        
+        # 时间范围
+        t_min, t_max = int(agg.at['min', 'timestamp']), int(agg.at['max', 'timestamp'])
+        start_time = datetime.fromtimestamp(t_min)
+        end_time = datetime.fromtimestamp(t_max)
+        duration = (t_max - t_min) // 60
+        
+        st.markdown(f"""
+        **时间范围**：
+        - 开始：{start_time.strftime('%Y-%m-%d %H:%M:%S')}
+        - 结束：{end_time.strftime('%Y-%m-%d %H:%M:%S')}
+        - 持续：{duration:.0f} 分钟
+        """)
+        
+        # 目标地址统计
+        if tracked_wallets and target_trades_count > 0:
+            target_sides = sides[target_mask]
+            target_buy = int((target_sides == 'BUY').sum())
+            target_sell = int((target_sides == 'SELL').sum())
+            target_volume = values[target_mask].sum()
             
-            st.download_button(
-                label=f"📥 下载 CSV ({len(all_trades):,} 笔交易)",
-                data=csv,
-                file_name=f"market_{selected_market.condition_id[:8]}_all_trades.csv",
-                mime="text/csv",
-                help="下载该市场的所有交易数据为CSV文件（包含目标地址标记）",
-                use_container_width=True
-            )
+            st.markdown(f"""
+            **目标地址统计**：
+            - 总交易：{target_trades_count} 笔
+            - 买入：{target_buy} 笔
+            - 卖出：{target_sell} 笔
+            - 交易额：${target_volume:,.2f}
+            - 占比：{target_trades_count/len(all_trades)*100:.2f}%
+            """)
+    
+    # 图表
+    st.markdown("---")
+    st.subheader("📈 交易时间序列")
+    
+    create_all_trades_chart_with_highlight(
+        all_trades,
+        selected_market.question,
+        target_address,
+        tracked_wallets
+    )
+    
+    # 导出功能
+    st.markdown("---")
+    st.subheader("📥 导出数据")
+    
+    # 按列构建导出数据（复用统计数组和目标地址掩码，时间整列格式化）
+    sizes, titles, slugs = zip(*map(_EXPORT_FIELDS, all_trades))
+    df_export = pd.DataFrame({
+        '时间': timestamps_to_datetime(all_trades).strftime('%Y-%m-%d %H:%M:%S'),
+        '方向': sides,
+        '价格': stats_arr['price'],
+        '数量': sizes,
+        '金额': values,
+        '是否为目标地址': np.where(target_mask, '⭐ 是', '否'),
+        '钱包地址': wallets,
+        '市场标题': titles,
+        '市场链接': MARKET_URL_PREFIX + pd.Series(slugs, dtype=object)
+    })
+    
+    # 直接以 utf-8-sig（支持中文）编码写入字节缓冲区
+    csv_buffer = io.BytesIO()
+    df_export.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
+    csv = csv_buffer.getvalue()
+    
+    st.download_button(
+        label=f"📥 下载 CSV ({len(all_trades):,} 笔交易)",
+        data=csv,
+        file_name=f"market_{selected_market.condition_id[:8]}_all_trades.csv",
+        mime="text/csv",
+        help="下载该市场的所有交易数据为CSV文件（包含目标地址标记）",
+        use_container_width=True
+    )
 
 
 if __name__ == "__main__":
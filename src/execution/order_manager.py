@@ -3,13 +3,27 @@
 注意：本模块仅进行模拟交易，不会调用真实的 Polymarket API 下单
 """
 import asyncio
+import itertools
+import logging
+import time
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from enum import Enum
 from datetime import datetime
+from config import Config
 from src.market.polymarket_api import PolymarketAPI, OrderBook
 from src.core.position import PairPosition
 
+logger = logging.getLogger(__name__)
+
+# 价格最小变动单位为 0.001，比较前统一换算为整数 tick，避免浮点误差导致的边界误判
+TICKS_PER_DOLLAR = 1000
+
+
+def to_ticks(price: float) -> int:
+    """将价格换算为整数 tick"""
+    return int(round(price * TICKS_PER_DOLLAR))
+
 
 class OrderStatus(Enum):
     PENDING = "pending"
@@ -28,23 +42,43 @@ class Order:
     filled_price: float = 0.0
     timestamp: datetime = field(default_factory=datetime.now)
     is_simulated: bool = True  # 标记为模拟交易
+    id: int = field(default_factory=itertools.count(1).__next__)  # 单调递增的订单编号
+    price_ticks: int = field(init=False)  # 以 tick 表示的订单价格，用于成交判断
+    
+    def __post_init__(self):
+        self.price_ticks = to_ticks(self.price)
 
 
 class OrderManager:
     """订单管理器（模拟交易模式）"""
     
-    def __init__(self, api: PolymarketAPI, condition_id: str, position: PairPosition):
+    def __init__(
+        self,
+        api: PolymarketAPI,
+        condition_id: str,
+        position: PairPosition,
+        orderbook_ttl: Optional[float] = Config.ORDERBOOK_TTL_SECONDS
+    ):
+        """
+        Args:
+            orderbook_ttl: 订单簿超过该时长（秒）未更新时，下单前重新获取；
+                None 表示只使用推送的订单簿（如演示模式），仅在还没有订单簿时获取
+        """
         self.api = api
         self.condition_id = condition_id
         self.position = position
-        self.pending_orders: List[Order] = []
+        # 订单编号 -> 订单，增删均为 O(1)；dict 保持插入顺序，遍历即按下单先后（FIFO）
+        self.pending_orders: Dict[int, Order] = {}
         self.filled_orders: List[Order] = []
         self.current_orderbook: Optional[OrderBook] = None
+        self.current_orderbook_ts = 0.0  # 最近一次更新订单簿的时间（time.monotonic）
+        self.orderbook_ttl = orderbook_ttl
         self.trade_history: List[Order] = []  # 所有交易历史
     
     def update_orderbook(self, orderbook: OrderBook):
         """更新订单簿"""
         self.current_orderbook = orderbook
+        self.current_orderbook_ts = time.monotonic()
     
     async def place_limit_order(self, side: str, qty: float, max_price: float) -> Optional[Order]:
         """
@@ -58,10 +92,15 @@ class OrderManager:
         Returns:
             订单对象
         """
-        if not self.current_orderbook:
-            # 获取最新订单簿
-            self.current_orderbook = await self.api.get_orderbook(self.condition_id)
-            if not self.current_orderbook:
+        # 订单簿足够新时直接使用，否则先获取最新订单簿
+        if not self.current_orderbook or (
+            self.orderbook_ttl is not None
+            and time.monotonic() - self.current_orderbook_ts > self.orderbook_ttl
+        ):
+            orderbook = await self.api.get_orderbook(self.condition_id)
+            if orderbook:
+                self.update_orderbook(orderbook)
+            elif not self.current_orderbook:
                 return None
         
         best_ask = self.current_orderbook.get_best_ask(side)
@@ -71,9 +110,7 @@ class OrderManager:
         
         # 计算目标价格：使用最佳卖价（确保能够成交），但不超过 max_price
         # 如果 max_price 小于 best_ask.price，说明价格太高，不应该下单
-        if max_price < best_ask.price:
-            import logging
-            logger = logging.getLogger(__name__)
+        if to_ticks(max_price) < to_ticks(best_ask.price):
             logger.warning(f"目标价格 {max_price:.4f} 低于最佳卖价 {best_ask.price:.4f}，无法下单")
             return None
         
@@ -81,7 +118,7 @@ class OrderManager:
         target_price = best_ask.price
         
         order = Order(side=side, price=target_price, qty=qty, is_simulated=True)
-        self.pending_orders.append(order)
+        self.pending_orders[order.id] = order
         
         # 模拟成交（不调用真实 API）
         await self._try_fill_order(order)
@@ -99,40 +136,39 @@ class OrderManager:
         # 模拟成交逻辑：基于真实订单簿数据，但不实际下单
         if self.current_orderbook:
             best_ask = self.current_orderbook.get_best_ask(order.side)
-            if best_ask and order.price >= best_ask.price:
+            if best_ask and order.price_ticks >= to_ticks(best_ask.price):
                 # 模拟订单成交
                 order.status = OrderStatus.FILLED
                 order.filled_qty = min(order.qty, best_ask.qty)
                 order.filled_price = best_ask.price
-                
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.info(f"订单成交: {order.side} {order.filled_qty:.2f} @ ${order.filled_price:.4f}")
+                # 日志级别关闭时跳过格式化
+                log_info = logger.isEnabledFor(logging.INFO)
+                if log_info:
+                    logger.info(f"订单成交: {order.side} {order.filled_qty:.2f} @ ${order.filled_price:.4f}")
                 
                 # 更新持仓（仅在内存中）
                 if order.side == "YES":
                     self.position.yes.add_position(order.filled_qty, order.filled_price)
-                    logger.info(f"YES 持仓更新: qty={self.position.yes.qty:.2f}, cost={self.position.yes.cost:.2f}, avg={self.position.yes.avg_price:.4f}")
+                    if log_info:
+                        logger.info(f"YES 持仓更新: qty={self.position.yes.qty:.2f}, cost={self.position.yes.cost:.2f}, avg={self.position.yes.avg_price:.4f}")
                 else:
                     self.position.no.add_position(order.filled_qty, order.filled_price)
-                    logger.info(f"NO 持仓更新: qty={self.position.no.qty:.2f}, cost={self.position.no.cost:.2f}, avg={self.position.no.avg_price:.4f}")
+                    if log_info:
+                        logger.info(f"NO 持仓更新: qty={self.position.no.qty:.2f}, cost={self.position.no.cost:.2f}, avg={self.position.no.avg_price:.4f}")
                 
                 # 移动到已成交列表
-                if order in self.pending_orders:
-                    self.pending_orders.remove(order)
+                self.pending_orders.pop(order.id, None)
                 self.filled_orders.append(order)
                 self.trade_history.append(order)  # 添加到交易历史
             else:
-                import logging
-                logger = logging.getLogger(__name__)
                 if best_ask:
                     logger.warning(f"订单无法成交: 订单价格 {order.price:.4f} < 最佳卖价 {best_ask.price:.4f}")
                 else:
                     logger.warning(f"订单无法成交: 没有最佳卖价")
     
     async def cancel_all_orders(self):
-        """取消所有待成交订单"""
-        for order in self.pending_orders:
+        """取消所有待成交订单（按下单顺序）"""
+        for order in self.pending_orders.values():
             order.status = OrderStatus.CANCELLED
         self.pending_orders.clear()
     
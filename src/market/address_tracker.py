@@ -5,16 +5,33 @@
 import asyncio
 import httpx
 import logging
-from typing import List, Dict, Optional
+import numpy as np
+from collections import OrderedDict
+from operator import attrgetter, itemgetter
+from typing import AsyncIterator, List, Dict, Optional, Set, Tuple
 from datetime import datetime
 from dataclasses import dataclass
+from src.market.json_codec import decode_json
 
 logger = logging.getLogger(__name__)
 
+# analyze_trades 一次提取的字段
+_ANALYZE_FIELDS = attrgetter('size', 'price', 'side', 'condition_id', 'proxy_wallet')
+
+# API 交易字典中构造 Trade 所需的键（顺序与 Trade 字段一致）
+_RAW_TRADE_FIELDS = itemgetter(
+    "proxyWallet", "side", "asset", "conditionId", "size", "price", "timestamp", "title", "slug"
+)
+
 
 @dataclass
 class Trade:
     """交易记录"""
+    # 显式声明 __slots__（等价于 Python 3.10 的 dataclass(slots=True)）：
+    # 单个市场可能有数十万笔交易，去掉每个实例的 __dict__ 可明显降低内存占用
+    # _datetime 不是字段，首次访问 datetime 时才写入
+    __slots__ = ('proxy_wallet', 'side', 'asset', 'condition_id', 'size', 'price', 'timestamp', 'title', 'slug', '_datetime')
+    
     proxy_wallet: str
     side: str  # BUY or SELL
     asset: str
@@ -32,8 +49,12 @@ class Trade:
     
     @property
     def datetime(self) -> datetime:
-        """交易时间"""
-        return datetime.fromtimestamp(self.timestamp)
+        """交易时间（首次访问时计算并缓存）"""
+        try:
+            return self._datetime
+        except AttributeError:
+            self._datetime = datetime.fromtimestamp(self.timestamp)
+            return self._datetime
     
     @property
     def market_url(self) -> str:
@@ -41,18 +62,185 @@ class Trade:
         return f"https://polymarket.com/event/{self.slug}"
 
 
+@dataclass
+class MarketAgg:
+    """单个市场的交易汇总"""
+    # 字段不能带类级默认值（与 __slots__ 冲突），创建时需全部传入
+    __slots__ = ('title', 'slug', 'trades', 'buy_count', 'sell_count', 'buy_volume', 'sell_volume')
+    
+    title: str
+    slug: str
+    trades: List[Trade]
+    buy_count: int
+    sell_count: int
+    buy_volume: float
+    sell_volume: float
+    
+    def to_dict(self) -> Dict:
+        """转换为 analyze_trades 结果中的市场字典（trades 列表不复制）"""
+        return {
+            "title": self.title,
+            "slug": self.slug,
+            "trades": self.trades,
+            "buy_count": self.buy_count,
+            "sell_count": self.sell_count,
+            "buy_volume": self.buy_volume,
+            "sell_volume": self.sell_volume
+        }
+
+
+class TradeAggregator:
+    """
+    交易增量汇总器
+    
+    分页获取时每解析完一页就调用 add_many 累加，结束后 snapshot() 直接得到
+    与 analyze_trades 相同结构的分析结果，无需在全部数据上再扫描一遍
+    """
+    
+    def __init__(self):
+        """初始化累计值"""
+        self.total_trades = 0
+        self.buy_trades = 0
+        self.sell_trades = 0
+        self.total_buy_volume = 0.0
+        self.total_sell_volume = 0.0
+        self.markets: Dict[str, MarketAgg] = {}
+        self.latest_trade: Optional[Trade] = None
+        self.proxy_wallets: Set[str] = set()  # 随 add 增量维护，snapshot 时无需再遍历交易
+    
+    def add(self, trade: Trade) -> None:
+        """累加单笔交易"""
+        if self.latest_trade is None:
+            self.latest_trade = trade
+        
+        value = trade.size * trade.price
+        is_buy = trade.side == "BUY"
+        self.total_trades += 1
+        if is_buy:
+            self.buy_trades += 1
+            self.total_buy_volume += value
+        elif trade.side == "SELL":
+            self.sell_trades += 1
+            self.total_sell_volume += value
+        self.proxy_wallets.add(trade.proxy_wallet)
+        
+        market = self._get_market(trade)
+        market.trades.append(trade)
+        # 非 BUY 的交易都计入卖出（与 analyze_trades 的口径一致）
+        if is_buy:
+            market.buy_count += 1
+            market.buy_volume += value
+        else:
+            market.sell_count += 1
+            market.sell_volume += value
+    
+    def add_many(self, trades: List[Trade]) -> None:
+        """
+        累加一批交易（通常是一页）
+        
+        批内在数组上归约：一次提取数值列，按市场编码后用 bincount 得到每个市场的笔数和金额
+        """
+        if not trades:
+            return
+        if self.latest_trade is None:
+            self.latest_trade = trades[0]
+        
+        n = len(trades)
+        sizes, prices, sides, condition_ids, wallets = zip(*map(_ANALYZE_FIELDS, trades))
+        values = np.asarray(sizes, dtype=np.float64) * np.asarray(prices, dtype=np.float64)
+        side_arr = np.asarray(sides, dtype=object)
+        is_buy = side_arr == "BUY"
+        is_sell = side_arr == "SELL"
+        
+        self.total_trades += n
+        self.buy_trades += int(is_buy.sum())
+        self.sell_trades += int(is_sell.sum())
+        self.total_buy_volume += float(values[is_buy].sum())
+        self.total_sell_volume += float(values[is_sell].sum())
+        # 钱包列与其他列在同一次提取中得到，直接并入集合
+        self.proxy_wallets.update(wallets)
+        
+        # 批内按市场编码（保持首次出现的顺序）
+        market_index: Dict[str, int] = {}
+        codes = np.fromiter(
+            (market_index.setdefault(cid, len(market_index)) for cid in condition_ids),
+            dtype=np.intp,
+            count=n
+        )
+        m = len(market_index)
+        buy_counts = np.bincount(codes, weights=is_buy, minlength=m)
+        buy_volumes = np.bincount(codes, weights=np.where(is_buy, values, 0.0), minlength=m)
+        # 非 BUY 的交易都计入卖出
+        sell_counts = np.bincount(codes, minlength=m) - buy_counts
+        sell_volumes = np.bincount(codes, weights=np.where(is_buy, 0.0, values), minlength=m)
+        
+        # 按市场分组
+        buckets: List[List[Trade]] = [[] for _ in range(m)]
+        for trade, code in zip(trades, codes.tolist()):
+            buckets[code].append(trade)
+        
+        for code, bucket in enumerate(buckets):
+            market = self._get_market(bucket[0])
+            market.trades.extend(bucket)
+            market.buy_count += int(buy_counts[code])
+            market.sell_count += int(sell_counts[code])
+            market.buy_volume += float(buy_volumes[code])
+            market.sell_volume += float(sell_volumes[code])
+    
+    def _get_market(self, trade: Trade) -> "MarketAgg":
+        """获取（必要时创建）交易所属市场的汇总项"""
+        market = self.markets.get(trade.condition_id)
+        if market is None:
+            market = self.markets[trade.condition_id] = MarketAgg(trade.title, trade.slug, [], 0, 0, 0.0, 0.0)
+        return market
+    
+    def snapshot(self) -> Dict:
+        """
+        生成当前的分析结果（只与市场数有关，不再遍历交易）
+        
+        各市场的 trades 列表与汇总器共享，之后继续 add 时会随之增长
+        """
+        if not self.total_trades:
+            return {
+                "total_trades": 0,
+                "buy_trades": 0,
+                "sell_trades": 0,
+                "total_buy_volume": 0,
+                "total_sell_volume": 0,
+                "markets_count": 0,
+                "markets": {}
+            }
+        
+        return {
+            "total_trades": self.total_trades,
+            "buy_trades": self.buy_trades,
+            "sell_trades": self.sell_trades,
+            "total_buy_volume": self.total_buy_volume,
+            "total_sell_volume": self.total_sell_volume,
+            "net_volume": self.total_buy_volume - self.total_sell_volume,
+            "markets_count": len(self.markets),
+            "markets": {cid: market.to_dict() for cid, market in self.markets.items()},
+            "latest_trade": self.latest_trade,
+            "proxy_wallets": list(self.proxy_wallets)
+        }
+
+
 class AddressTracker:
     """地址追踪器"""
     
     DATA_API_BASE = "https://data-api.polymarket.com"
+    # 带 ETag 的分页结果最多缓存的页数
+    PAGE_CACHE_SIZE = 256
     
     def __init__(self):
         """初始化追踪器"""
         self.client: Optional[httpx.AsyncClient] = None
+        # (查询条件, 每页数量, offset) -> (etag, 原始条数, 解析后的交易)，按最近使用排序
+        self._page_cache: "OrderedDict[tuple, Tuple[str, int, List[Trade]]]" = OrderedDict()
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        self.client = httpx.AsyncClient(timeout=30.0, verify=False)
+        self.client = self._create_client()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -63,9 +251,28 @@ class AddressTracker:
     async def _ensure_client(self) -> httpx.AsyncClient:
         """确保客户端存在"""
         if self.client is None:
-            self.client = httpx.AsyncClient(timeout=30.0, verify=False)
+            self.client = self._create_client()
         return self.client
     
+    @staticmethod
+    def _create_client() -> httpx.AsyncClient:
+        """
+        创建 HTTP 客户端
+        
+        连接池容量覆盖并发分页的请求数，空闲连接保持一段时间，
+        同一个 tracker 的分页、状态查询等请求复用已建立的 TLS 连接
+        """
+        # 传入 transport 时 verify / limits 需配置在 transport 上（客户端上的同名参数不再生效）
+        transport = httpx.AsyncHTTPTransport(
+            verify=False,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0),
+            retries=2,  # 建立连接失败时自动重试
+        )
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),  # 连接超时 10 秒，总超时 30 秒
+            transport=transport
+        )
+    
     async def get_address_trades(
         self, 
         address: str, 
@@ -94,28 +301,10 @@ class AddressTracker:
             response = await client.get(url, params=params)
             
             if response.status_code == 200:
-                trades_data = response.json()
+                trades_data = decode_json(response)
                 
                 if isinstance(trades_data, list):
-                    trades = []
-                    for trade_data in trades_data:
-                        try:
-                            trade = Trade(
-                                proxy_wallet=trade_data.get("proxyWallet", ""),
-                                side=trade_data.get("side", ""),
-                                asset=trade_data.get("asset", ""),
-                                condition_id=trade_data.get("conditionId", ""),
-                                size=float(trade_data.get("size", 0)),
-                                price=float(trade_data.get("price", 0)),
-                                timestamp=int(trade_data.get("timestamp", 0)),
-                                title=trade_data.get("title", "Unknown"),
-                                slug=trade_data.get("slug", "")
-                            )
-                            trades.append(trade)
-                        except Exception as e:
-                            logger.warning(f"解析交易数据失败: {e}")
-                            continue
-                    
+                    trades = self._parse_trades(trades_data)
                     logger.info(f"✓ 获取到 {len(trades)} 笔交易")
                     return trades
                 else:
@@ -134,95 +323,31 @@ class AddressTracker:
         self,
         address: str,
         max_trades: Optional[int] = None,
-        batch_size: int = 500
+        batch_size: int = 500,
+        concurrency: int = 8,
+        aggregator: Optional[TradeAggregator] = None
     ) -> List[Trade]:
         """
-        获取地址的所有交易（通过分页突破单次500笔限制）
+        获取地址的所有交易（通过并发分页突破单次500笔限制）
         
         Args:
             address: 以太坊地址（0x开头）
             max_trades: 最大获取数量（None表示不限制）
             batch_size: 每批获取的数量（API限制最大500）
+            concurrency: 每轮并发请求的页数（控制请求速率）
+            aggregator: 可选的汇总器，每解析完一页即累加（省去之后的 analyze_trades）
         
         Returns:
             所有交易列表
         """
-        all_trades = []
-        offset = 0
-        client = await self._ensure_client()
-        
         # 确保 batch_size 不超过 API 限制
         batch_size = min(batch_size, 500)
         
-        logger.info(f"开始分页获取地址 {address[:10]}... 的所有交易...")
-        
-        while True:
-            try:
-                url = f"{self.DATA_API_BASE}/trades"
-                params = {
-                    "address": address,
-                    "limit": batch_size,
-                    "offset": offset
-                }
-                
-                logger.info(f"  获取第 {offset//batch_size + 1} 批（offset={offset}）...")
-                response = await client.get(url, params=params)
-                
-                if response.status_code != 200:
-                    logger.error(f"API 请求失败: {response.status_code}")
-                    break
-                
-                trades_data = response.json()
-                
-                if not isinstance(trades_data, list) or len(trades_data) == 0:
-                    logger.info(f"  没有更多数据，已获取完毕")
-                    break
-                
-                # 解析交易数据
-                batch_trades = []
-                for trade_data in trades_data:
-                    try:
-                        trade = Trade(
-                            proxy_wallet=trade_data.get("proxyWallet", ""),
-                            side=trade_data.get("side", ""),
-                            asset=trade_data.get("asset", ""),
-                            condition_id=trade_data.get("conditionId", ""),
-                            size=float(trade_data.get("size", 0)),
-                            price=float(trade_data.get("price", 0)),
-                            timestamp=int(trade_data.get("timestamp", 0)),
-                            title=trade_data.get("title", "Unknown"),
-                            slug=trade_data.get("slug", "")
-                        )
-                        batch_trades.append(trade)
-                    except Exception as e:
-                        logger.warning(f"解析交易数据失败: {e}")
-                        continue
-                
-                all_trades.extend(batch_trades)
-                logger.info(f"  ✓ 获取 {len(batch_trades)} 笔，累计 {len(all_trades)} 笔")
-                
-                # 检查是否达到最大数量
-                if max_trades and len(all_trades) >= max_trades:
-                    logger.info(f"  已达到最大数量限制 {max_trades}")
-                    all_trades = all_trades[:max_trades]
-                    break
-                
-                # 检查是否获取完毕（返回数量 < batch_size 表示没有更多数据）
-                if len(trades_data) < batch_size:
-                    logger.info(f"  返回数据少于批次大小，已获取完毕")
-                    break
-                
-                offset += batch_size
-                
-                # 添加短暂延迟，避免请求过快
-                await asyncio.sleep(0.3)
-                
-            except Exception as e:
-                logger.error(f"获取交易数据失败: {e}")
-                break
-        
-        logger.info(f"✓ 分页获取完成，共获取 {len(all_trades)} 笔交易")
-        return all_trades
+        return await self._collect_trades_parallel(
+            {"address": address}, f"地址 {address[:10]}...",
+            max_trades=max_trades, batch_size=batch_size, concurrency=concurrency,
+            aggregator=aggregator
+        )
     
     async def get_market_trades(
         self,
@@ -252,28 +377,10 @@ class AddressTracker:
             response = await client.get(url, params=params)
             
             if response.status_code == 200:
-                trades_data = response.json()
+                trades_data = decode_json(response)
                 
                 if isinstance(trades_data, list):
-                    trades = []
-                    for trade_data in trades_data:
-                        try:
-                            trade = Trade(
-                                proxy_wallet=trade_data.get("proxyWallet", ""),
-                                side=trade_data.get("side", ""),
-                                asset=trade_data.get("asset", ""),
-                                condition_id=trade_data.get("conditionId", ""),
-                                size=float(trade_data.get("size", 0)),
-                                price=float(trade_data.get("price", 0)),
-                                timestamp=int(trade_data.get("timestamp", 0)),
-                                title=trade_data.get("title", "Unknown"),
-                                slug=trade_data.get("slug", "")
-                            )
-                            trades.append(trade)
-                        except Exception as e:
-                            logger.warning(f"解析交易数据失败: {e}")
-                            continue
-                    
+                    trades = self._parse_trades(trades_data)
                     logger.info(f"✓ 获取到 {len(trades)} 笔交易")
                     return trades
                 else:
@@ -297,152 +404,253 @@ class AddressTracker:
         Returns:
             分析结果字典
         """
-        if not trades:
-            return {
-                "total_trades": 0,
-                "buy_trades": 0,
-                "sell_trades": 0,
-                "total_buy_volume": 0,
-                "total_sell_volume": 0,
-                "markets_count": 0,
-                "markets": {}
-            }
-        
-        buy_trades = [t for t in trades if t.side == "BUY"]
-        sell_trades = [t for t in trades if t.side == "SELL"]
-        
-        total_buy_volume = sum(t.value for t in buy_trades)
-        total_sell_volume = sum(t.value for t in sell_trades)
-        
-        # 按市场分组
-        markets = {}
-        for trade in trades:
-            condition_id = trade.condition_id
-            
-            if condition_id not in markets:
-                markets[condition_id] = {
-                    "title": trade.title,
-                    "slug": trade.slug,
-                    "trades": [],
-                    "buy_count": 0,
-                    "sell_count": 0,
-                    "buy_volume": 0,
-                    "sell_volume": 0
-                }
-            
-            market = markets[condition_id]
-            market["trades"].append(trade)
-            
-            if trade.side == "BUY":
-                market["buy_count"] += 1
-                market["buy_volume"] += trade.value
-            else:
-                market["sell_count"] += 1
-                market["sell_volume"] += trade.value
-        
-        return {
-            "total_trades": len(trades),
-            "buy_trades": len(buy_trades),
-            "sell_trades": len(sell_trades),
-            "total_buy_volume": total_buy_volume,
-            "total_sell_volume": total_sell_volume,
-            "net_volume": total_buy_volume - total_sell_volume,
-            "markets_count": len(markets),
-            "markets": markets,
-            "latest_trade": trades[0] if trades else None,
-            "proxy_wallets": list(set(t.proxy_wallet for t in trades))
-        }
+        aggregator = TradeAggregator()
+        aggregator.add_many(trades)
+        return aggregator.snapshot()
     
     async def get_all_market_trades(
         self,
         condition_id: str,
         max_trades: Optional[int] = None,
-        batch_size: int = 1000
+        batch_size: int = 1000,
+        concurrency: int = 8,
+        aggregator: Optional[TradeAggregator] = None
     ) -> List[Trade]:
         """
-        获取市场的所有交易（通过分页突破单次限制）
+        获取市场的所有交易（通过并发分页突破单次限制）
         
         Args:
             condition_id: 市场条件ID
             max_trades: 最大获取数量（None表示不限制）
             batch_size: 每批获取的数量（建议1000）
+            concurrency: 每轮并发请求的页数（控制请求速率）
+            aggregator: 可选的汇总器，每解析完一页即累加（省去之后的 analyze_trades）
         
         Returns:
             所有交易列表
         """
-        all_trades = []
-        offset = 0
-        client = await self._ensure_client()
+        return await self._collect_trades_parallel(
+            {"market": condition_id}, f"市场 {condition_id[:10]}...",
+            max_trades=max_trades, batch_size=batch_size, concurrency=concurrency,
+            aggregator=aggregator
+        )
+    
+    async def stream_market_trades_parallel(
+        self,
+        condition_id: str,
+        max_trades: Optional[int] = None,
+        batch_size: int = 1000,
+        concurrency: int = 8
+    ) -> AsyncIterator[List[Trade]]:
+        """
+        并发分页获取市场的所有交易，按页逐批产出
         
-        logger.info(f"开始分页获取市场 {condition_id[:10]}... 的所有交易...")
+        每解析完一页即 yield，调用方可在页与页之间更新进度，而不必等待全部数据返回
         
-        while True:
+        Yields:
+            每页解析后的交易列表（按 offset 顺序）
+        """
+        async for trades in self._stream_trades_parallel(
+            {"market": condition_id}, f"市场 {condition_id[:10]}...",
+            max_trades=max_trades, batch_size=batch_size, concurrency=concurrency
+        ):
+            yield trades
+    
+    async def _collect_trades_parallel(
+        self,
+        filters: Dict[str, str],
+        label: str,
+        max_trades: Optional[int],
+        batch_size: int,
+        concurrency: int,
+        aggregator: Optional[TradeAggregator] = None
+    ) -> List[Trade]:
+        """并发分页获取全部交易并合并为一个列表（传入 aggregator 时逐页累加统计）"""
+        # 已知上限时一次性预分配，按页切片写入，避免列表反复扩容
+        all_trades = [None] * max_trades if max_trades else []
+        count = 0
+        async for trades in self._stream_trades_parallel(
+            filters, label, max_trades=max_trades, batch_size=batch_size, concurrency=concurrency
+        ):
+            all_trades[count:count + len(trades)] = trades
+            count += len(trades)
+            if aggregator is not None:
+                aggregator.add_many(trades)
+        del all_trades[count:]
+        
+        logger.info(f"✓ 并发分页获取完成，共获取 {len(all_trades)} 笔交易")
+        return all_trades
+    
+    async def _stream_trades_parallel(
+        self,
+        filters: Dict[str, str],
+        label: str,
+        max_trades: Optional[int],
+        batch_size: int,
+        concurrency: int
+    ) -> AsyncIterator[List[Trade]]:
+        """
+        并发分页获取 /trades 接口的数据，按页逐批产出
+        
+        先请求首页，首页已满时每轮同时请求 concurrency 页（offset 连续），
+        任一页返回不足 batch_size 或达到 max_trades 时停止；产出顺序与串行分页一致
+        
+        Args:
+            filters: 查询条件（如 {"market": condition_id} 或 {"address": address}）
+            label: 日志中显示的对象描述
+            max_trades: 最大获取数量（None表示不限制）
+            batch_size: 每批获取的数量
+            concurrency: 每轮并发请求的页数（控制请求速率）
+        """
+        client = await self._ensure_client()
+        url = f"{self.DATA_API_BASE}/trades"
+        cache_prefix = (tuple(sorted(filters.items())), batch_size)
+        # 服务器提示配额用尽时，本轮结束后需要等待的秒数
+        throttle_delay = 0.0
+        
+        async def fetch_page(offset: int) -> Optional[Tuple[int, List[Trade]]]:
+            # 页面在这里就解析为 Trade 并返回原始条数：解码出的字典随函数返回即被释放，
+            # 而不是整轮的原始页面都留在内存里等待解析
+            nonlocal throttle_delay
+            cache_key = cache_prefix + (offset,)
+            cached = self._page_cache.get(cache_key)
             try:
-                url = f"{self.DATA_API_BASE}/trades"
                 params = {
-                    "market": condition_id,
+                    **filters,
                     "limit": batch_size,
                     "offset": offset
                 }
+                # 之前获取过该页时带上 ETag，未变化的页只返回 304
+                headers = {"If-None-Match": cached[0]} if cached else None
+                response = await client.get(url, params=params, headers=headers)
+                if response.status_code == 429:
+                    # 被限流：按 Retry-After 等待后重试一次
+                    delay = self._retry_after(response)
+                    logger.warning(f"请求被限流，{delay:.1f} 秒后重试（offset={offset}）")
+                    await asyncio.sleep(delay)
+                    response = await client.get(url, params=params, headers=headers)
+                if response.headers.get("x-ratelimit-remaining") == "0":
+                    throttle_delay = max(throttle_delay, self._retry_after(response))
                 
-                logger.info(f"  获取第 {offset//batch_size + 1} 批（offset={offset}）...")
-                response = await client.get(url, params=params)
-                
+                if response.status_code == 304 and cached:
+                    self._page_cache.move_to_end(cache_key)
+                    return cached[1], cached[2]
                 if response.status_code != 200:
-                    logger.error(f"API 请求失败: {response.status_code}")
-                    break
-                
-                trades_data = response.json()
+                    logger.error(f"API 请求失败: {response.status_code}（offset={offset}）")
+                    return None
+                trades_data = decode_json(response)
+                if not isinstance(trades_data, list):
+                    return None
+                page = (len(trades_data), self._parse_trades(trades_data))
                 
-                if not isinstance(trades_data, list) or len(trades_data) == 0:
-                    logger.info(f"  没有更多数据，已获取完毕")
+                etag = response.headers.get("etag")
+                if etag:
+                    self._page_cache[cache_key] = (etag,) + page
+                    self._page_cache.move_to_end(cache_key)
+                    if len(self._page_cache) > self.PAGE_CACHE_SIZE:
+                        self._page_cache.popitem(last=False)
+                return page
+            except Exception as e:
+                logger.error(f"获取交易数据失败（offset={offset}）: {e}")
+                return None
+        
+        total = 0
+        # 已获取的原始条数（含无法解析的行）：分页进度按它计算，而不是按解析出的交易数
+        fetched = 0
+        offset = 0
+        finished = False
+        # 第一轮只请求首页：多数查询一页即可取完，无需发出整轮并发请求
+        round_size = 1
+        
+        logger.info(f"开始并发分页获取{label} 的所有交易（每轮 {concurrency} 页）...")
+        
+        while not finished:
+            offsets = [offset + i * batch_size for i in range(round_size)]
+            if max_trades:
+                offsets = [o for o in offsets if o < max_trades]
+            if not offsets:
+                break
+            
+            pages = await asyncio.gather(*(fetch_page(o) for o in offsets))
+            
+            for page in pages:
+                if not page or not page[0]:
+                    finished = True
                     break
-                
-                # 解析交易数据
-                batch_trades = []
-                for trade_data in trades_data:
-                    try:
-                        trade = Trade(
-                            proxy_wallet=trade_data.get("proxyWallet", ""),
-                            side=trade_data.get("side", ""),
-                            asset=trade_data.get("asset", ""),
-                            condition_id=trade_data.get("conditionId", ""),
-                            size=float(trade_data.get("size", 0)),
-                            price=float(trade_data.get("price", 0)),
-                            timestamp=int(trade_data.get("timestamp", 0)),
-                            title=trade_data.get("title", "Unknown"),
-                            slug=trade_data.get("slug", "")
-                        )
-                        batch_trades.append(trade)
-                    except Exception as e:
-                        logger.warning(f"解析交易数据失败: {e}")
-                        continue
-                
-                all_trades.extend(batch_trades)
-                logger.info(f"  ✓ 获取 {len(batch_trades)} 笔，累计 {len(all_trades)} 笔")
-                
-                # 检查是否达到最大数量
-                if max_trades and len(all_trades) >= max_trades:
+                raw_count, trades = page
+                fetched += raw_count
+                if max_trades and total + len(trades) >= max_trades:
                     logger.info(f"  已达到最大数量限制 {max_trades}")
-                    all_trades = all_trades[:max_trades]
-                    break
-                
-                # 检查是否获取完毕（返回数量 < batch_size 表示没有更多数据）
-                if len(trades_data) < batch_size:
-                    logger.info(f"  返回数据少于批次大小，已获取完毕")
+                    yield trades[:max_trades - total]
+                    return
+                total += len(trades)
+                yield trades
+                # 返回数量 < batch_size 表示没有更多数据；原始条数达到 max_trades 时也不再请求
+                if raw_count < batch_size or (max_trades and fetched >= max_trades):
+                    finished = True
                     break
-                
-                offset += batch_size
-                
-                # 添加短暂延迟，避免请求过快
-                await asyncio.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"获取交易数据失败: {e}")
-                break
+            
+            logger.info(f"  ✓ 本轮 offset {offsets[0]}~{offsets[-1]}，累计 {total} 笔")
+            
+            offset = offsets[-1] + batch_size
+            round_size = concurrency
+            
+            if not finished and throttle_delay:
+                # 只在服务器提示配额用尽时等待，否则直接发出下一轮
+                logger.info(f"  请求配额已用尽，等待 {throttle_delay:.1f} 秒")
+                await asyncio.sleep(throttle_delay)
+                throttle_delay = 0.0
+    
+    @staticmethod
+    def _retry_after(response: httpx.Response, default: float = 1.0) -> float:
+        """读取 Retry-After 头（秒），缺失或无法解析时返回默认值"""
+        try:
+            return max(0.0, float(response.headers.get("retry-after", default)))
+        except ValueError:
+            return default
+    
+    @staticmethod
+    def _trade_from_raw(trade_data: dict) -> Trade:
+        """
+        将单条 API 交易字典解析为 Trade
         
-        logger.info(f"✓ 分页获取完成，共获取 {len(all_trades)} 笔交易")
-        return all_trades
+        字段齐全时用 itemgetter 一次取出全部字段（按位置构造），缺字段时再按默认值逐项补齐
+        """
+        try:
+            proxy_wallet, side, asset, condition_id, size, price, timestamp, title, slug = _RAW_TRADE_FIELDS(trade_data)
+        except KeyError:
+            return Trade(
+                proxy_wallet=trade_data.get("proxyWallet", ""),
+                side=trade_data.get("side", ""),
+                asset=trade_data.get("asset", ""),
+                condition_id=trade_data.get("conditionId", ""),
+                size=float(trade_data.get("size", 0)),
+                price=float(trade_data.get("price", 0)),
+                timestamp=int(trade_data.get("timestamp", 0)),
+                title=trade_data.get("title", "Unknown"),
+                slug=trade_data.get("slug", "")
+            )
+        return Trade(
+            proxy_wallet, side, asset, condition_id,
+            float(size), float(price), int(timestamp), title, slug
+        )
+    
+    @classmethod
+    def _parse_trades(cls, trades_data: list) -> List[Trade]:
+        """将 API 返回的交易字典列表解析为 Trade 列表（跳过无法解析的记录）"""
+        # 页大小已知，按页预分配后按下标写入，最后截掉因解析失败而空出的尾部
+        trades = [None] * len(trades_data)
+        count = 0
+        trade_from_raw = cls._trade_from_raw
+        for trade_data in trades_data:
+            try:
+                trades[count] = trade_from_raw(trade_data)
+                count += 1
+            except Exception as e:
+                logger.warning(f"解析交易数据失败: {e}")
+                continue
+        del trades[count:]
+        return trades
     
     async def get_market_status(self, slug: str) -> Optional[Dict]:
         """
@@ -462,7 +670,7 @@ class AddressTracker:
             response = await client.get(url, timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
+                data = decode_json(response)
                 if isinstance(data, list) and len(data) > 0:
                     event = data[0]
                     markets = event.get("markets", [])
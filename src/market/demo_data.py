@@ -94,12 +94,28 @@ def create_demo_orderbook() -> OrderBook:
 
 
 def update_demo_orderbook(orderbook: OrderBook, volatility: float = 0.02) -> OrderBook:
-    """更新演示订单簿（模拟价格波动）"""
+    """
+    更新演示订单簿（模拟价格波动）
+    
+    在原订单簿上原地平移各层级价格并扰动数量：同一侧所有层级平移相同幅度，
+    排序天然保持，不再每次重新生成订单簿
+    """
     # 随机游走
     yes_mid = orderbook.yes_mid_price
     change = random.gauss(0, volatility)
     new_yes_price = max(0.1, min(0.9, yes_mid + change))
+    change = new_yes_price - yes_mid
     
-    # 重新生成订单簿
-    return create_demo_orderbook()
-
+    # YES 与 NO 价格反向变动
+    for levels, shift in (
+        (orderbook.yes_bids, change),
+        (orderbook.yes_asks, change),
+        (orderbook.no_bids, -change),
+        (orderbook.no_asks, -change),
+    ):
+        for level in levels:
+            level.price += shift
+            level.qty = random.uniform(50, 200)
+    
+    orderbook.timestamp = datetime.now()
+    return orderbook
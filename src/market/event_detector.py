@@ -10,6 +10,11 @@ from src.market.polymarket_api import PolymarketAPI, Market, OrderBook
 logger = logging.getLogger(__name__)
 
 
+def _end_date_key(market: Market) -> datetime:
+    """按结束时间排序的键（没有结束时间的视为最晚结束）"""
+    return market.end_date or datetime.max
+
+
 class EventDetector:
     """事件检测器"""
     
@@ -42,7 +47,7 @@ class EventDetector:
         logger.info(f"从 Gamma API 获取了 {len(all_markets)} 个市场，筛选后剩余 {len(filtered)} 个 BTC/ETH 15分钟市场")
         
         # 按结束时间排序，选择最近的市场
-        filtered.sort(key=lambda m: m.end_date or datetime.max, reverse=True)
+        filtered.sort(key=_end_date_key, reverse=True)
         
         self.detected_markets = filtered
         
@@ -104,15 +109,42 @@ class EventDetector:
             logger.warning(f"WebSocket 订阅失败，改用轮询: {e}")
             
             # 回退到轮询模式
-            while True:
-                try:
-                    orderbook = await self.api.get_orderbook(market.condition_id)
+            await self._poll_orderbook(market.condition_id, orderbook_callback, update_interval)
+    
+    async def _poll_orderbook(
+        self,
+        condition_id: str,
+        orderbook_callback: Callable[[OrderBook], None],
+        update_interval: float
+    ):
+        """
+        轮询订单簿
+        
+        拿到本次结果后先发出下一次请求再执行回调，网络等待与回调处理重叠，
+        实际周期约为 max(请求耗时, update_interval)；出错时按指数退避重新开始
+        """
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        
+        while True:
+            fetch_task = asyncio.create_task(self.api.get_orderbook(condition_id))
+            try:
+                while True:
+                    started = loop.time()
+                    orderbook = await fetch_task
+                    fetch_task = asyncio.create_task(self.api.get_orderbook(condition_id))
                     if orderbook:
                         orderbook_callback(orderbook)
-                    await asyncio.sleep(update_interval)
-                except Exception as e:
-                    logger.error(f"轮询订单簿失败: {e}")
-                    await asyncio.sleep(1)
+                    backoff = 1.0
+                    await asyncio.sleep(max(0.0, update_interval - (loop.time() - started)))
+            except Exception as e:
+                logger.error(f"轮询订单簿失败: {e}")
+            finally:
+                # 出错或被取消时丢弃已发出的预取请求
+                fetch_task.cancel()
+            
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 10.0)
     
     def get_market_info(self) -> Optional[dict]:
         """获取当前市场信息"""
@@ -0,0 +1,21 @@
+"""
+JSON 解码：安装了 orjson 时使用 orjson（可选依赖），否则使用标准库 json
+"""
+import json
+
+import httpx
+
+try:
+    import orjson  # 可选：市场列表、交易列表等较大的响应解码更快
+except ImportError:
+    orjson = None
+
+# 解码 bytes 或 str
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def decode_json(response: httpx.Response):
+    """解码响应 JSON（安装了 orjson 时直接解码原始字节）"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
@@ -3,16 +3,61 @@
 用于搜索和筛选 Polymarket 市场
 """
 import asyncio
+import heapq
 import logging
-from typing import List, Optional, Dict
-from datetime import datetime
+import re
+import time
+from typing import Any, Callable, FrozenSet, List, Optional, Dict, Tuple
+from datetime import datetime, timedelta
 import httpx
+from src.market.json_codec import decode_json
 
 logger = logging.getLogger(__name__)
 
+# 各加密货币在市场标题（大写）中的关键词
+_CRYPTO_KEYWORDS: Dict[str, FrozenSet[str]] = {
+    'BTC': frozenset({'BTC', 'BITCOIN'}),
+    'ETH': frozenset({'ETH', 'ETHEREUM'}),
+    'SOL': frozenset({'SOL', 'SOLANA'}),
+    'XRP': frozenset({'XRP', 'RIPPLE'})
+}
+
+# 15分钟市场标题中的时间区间特征（如 10:30AM-10:45AM）
+_AMPM_RANGE_PATTERN = re.compile(r'[AP]M-')
+
+# /markets 结果的标题筛选（子串匹配、不区分大小写，每个标题各扫描一遍）
+_BTC_PATTERN = re.compile(r'btc|bitcoin', re.IGNORECASE)
+_15MIN_PATTERN = re.compile(r'15|fifteen', re.IGNORECASE)
+
+
+def _is_btc_15min_title(question: str) -> bool:
+    """标题是否为 BTC 15分钟市场"""
+    return _BTC_PATTERN.search(question) is not None and _15MIN_PATTERN.search(question) is not None
+
+
+def _parse_end_ts(end_date: Optional[str]) -> int:
+    """
+    将 endDate（如 "2025-09-13T05:30:00.000Z"）解析为 Unix 时间戳
+    
+    缺失或无法解析时返回 -1
+    """
+    if not end_date:
+        return -1
+    try:
+        return int(datetime.fromisoformat(end_date.replace('Z', '+00:00')).timestamp())
+    except (AttributeError, TypeError, ValueError):
+        return -1
+
+
+def _end_date_key(market: "MarketInfo") -> int:
+    """按结束时间排序的键（整数时间戳；缺失的排在最后）"""
+    return market.end_ts
+
 
 class MarketInfo:
     """市场信息"""
+    __slots__ = ('condition_id', 'question', 'slug', 'end_date', 'end_ts', 'closed', 'active', 'accepting_orders')
+    
     def __init__(
         self,
         condition_id: str,
@@ -27,6 +72,7 @@ class MarketInfo:
         self.question = question
         self.slug = slug
         self.end_date = end_date
+        self.end_ts = _parse_end_ts(end_date)  # 创建时解析一次，排序和时间筛选都用整数比较
         self.closed = closed
         self.active = active
         self.accepting_orders = accepting_orders
@@ -52,24 +98,136 @@ class MarketSearcher:
     
     GAMMA_API_BASE = "https://gamma-api.polymarket.com"
     DATA_API_BASE = "https://data-api.polymarket.com"
+    # 同时进行的 /events 查询数
+    EVENT_FETCH_CONCURRENCY = 16
+    # /markets 单页条数：limit 更大时按 offset 拆成多页并行请求
+    MARKETS_PAGE_SIZE = 100
+    # 响应缓存时长（秒）：事件详情变化慢，市场列表需要较新
+    EVENT_CACHE_TTL = 30.0
+    MARKETS_CACHE_TTL = 10.0
+    RESPONSE_CACHE_SIZE = 4096
+    # 响应体超过该字节数时在线程池中解码 JSON，避免阻塞事件循环
+    JSON_OFFLOAD_BYTES = 256 * 1024
+    
+    # (url, 参数) -> (过期时间, 解码后的 JSON)；类级共享，每次搜索新建的搜索器也能命中
+    _response_cache: Dict[tuple, Tuple[float, Any]] = {}
     
     def __init__(self):
         self.client: Optional[httpx.AsyncClient] = None
     
     async def __aenter__(self):
-        self.client = httpx.AsyncClient()
+        await self._ensure_client()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.client:
-            await self.client.aclose()
+        await self.close()
     
-    async def _ensure_client(self):
+    async def _ensure_client(self) -> httpx.AsyncClient:
         """确保客户端存在"""
-        if not self.client:
-            self.client = httpx.AsyncClient()
+        if self.client is None:
+            self.client = self._create_client()
         return self.client
     
+    @staticmethod
+    def _create_client() -> httpx.AsyncClient:
+        """
+        创建 HTTP 客户端
+        
+        连接池容量覆盖逐个 slug 查询事件的突发请求，空闲连接保持一段时间，
+        同一个搜索器的各次请求复用已建立的 TLS 连接
+        """
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128, keepalive_expiry=60.0),
+            timeout=httpx.Timeout(10.0, connect=3.0),  # 连接超时 3 秒，总超时 10 秒（各请求可单独覆盖）
+        )
+    
+    async def close(self):
+        """关闭客户端"""
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+    
+    async def _adecode_json(self, response: httpx.Response):
+        """
+        异步解码响应 JSON
+        
+        大响应（如 limit=3000 的 /trades）放到线程池解码，期间事件循环可继续
+        处理其他并发请求；小响应直接解码，省去线程切换开销
+        """
+        if len(response.content) < self.JSON_OFFLOAD_BYTES:
+            return decode_json(response)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, decode_json, response)
+    
+    async def _get_json(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        ttl: float = 0.0,
+        timeout: float = 10
+    ) -> Any:
+        """
+        GET 请求并解码 JSON（带 TTL 缓存）
+        
+        缓存未过期时直接返回；请求失败时退回到已过期的缓存数据
+        
+        Returns:
+            解码后的 JSON，请求失败且没有缓存时返回 None（请求异常且没有缓存时抛出）
+        """
+        key = (url, tuple(sorted(params.items())) if params else ())
+        cached = self._response_cache.get(key)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        client = await self._ensure_client()
+        try:
+            response = await client.get(url, params=params, timeout=timeout)
+            if response.status_code == 200:
+                data = await self._adecode_json(response)
+                cache = self._response_cache
+                cache.pop(key, None)
+                cache[key] = (now + ttl, data)
+                if len(cache) > self.RESPONSE_CACHE_SIZE:
+                    # 字典按写入顺序排列，淘汰最早写入的一项
+                    del cache[next(iter(cache))]
+                return data
+            logger.error(f"API 请求失败: {response.status_code}")
+        except Exception as e:
+            if cached is None:
+                raise
+            if logger.isEnabledFor(logging.WARNING):
+                logger.warning(f"请求失败，使用缓存数据: {e}")
+        
+        return cached[1] if cached else None
+    
+    async def _fetch_event_market(
+        self,
+        slug: str,
+        semaphore: asyncio.Semaphore
+    ) -> Optional[Dict]:
+        """
+        通过 /events 获取 slug 对应事件的第一个市场
+        
+        Returns:
+            市场字典，获取失败时返回 None
+        """
+        async with semaphore:
+            try:
+                market_data = await self._get_json(
+                    f"{self.GAMMA_API_BASE}/events",
+                    {"slug": slug},
+                    ttl=self.EVENT_CACHE_TTL,
+                    timeout=3
+                )
+                if market_data and len(market_data) > 0:
+                    markets = market_data[0].get('markets', [])
+                    if markets and len(markets) > 0:
+                        return markets[0]
+            except Exception:
+                pass  # 获取失败时调用方使用基本信息
+        return None
+    
     async def get_markets_from_address_trades(
         self,
         address: str,
@@ -113,105 +271,75 @@ class MarketSearcher:
                 logger.error(f"API 请求失败: {response.status_code}")
                 return []
             
-            trades_data = response.json()
+            trades_data = await self._adecode_json(response)
             
             if not isinstance(trades_data, list):
                 return []
             
             logger.info(f"获取到 {len(trades_data)} 笔交易")
             
-            # 筛选最近N小时的交易
-            recent_trades = []
-            for trade in trades_data:
-                trade_timestamp = trade.get('timestamp', 0)
-                if trade_timestamp >= cutoff_timestamp:
-                    recent_trades.append(trade)
-            
-            logger.info(f"其中最近 {hours} 小时内的交易: {len(recent_trades)} 笔")
-            
-            # 提取市场信息
-            seen_markets = {}  # 用 conditionId 去重
+            # 提取候选市场（时间筛选与市场筛选在同一遍中完成；先去重筛选，再统一获取详情）
+            seen_ids = set()  # 已收集的 conditionId，用于去重
+            pending: List[Tuple[str, str, str]] = []  # (conditionId, title, slug)，按首次出现顺序
+            crypto_upper = crypto.upper()
+            keywords = _CRYPTO_KEYWORDS.get(crypto_upper) or frozenset({crypto_upper})
+            recent_count = 0
             
-            for trade in recent_trades:
-                try:
-                    title = trade.get('title', '')
-                    slug = trade.get('slug', '')
-                    condition_id = trade.get('conditionId', '')
-                    
-                    # 筛选15分钟市场
-                    if not condition_id or condition_id in seen_markets:
-                        continue
-                    
-                    # 检查是否是指定加密货币的15分钟市场
-                    crypto_upper = crypto.upper()
-                    crypto_keywords = {
-                        'BTC': ['BTC', 'BITCOIN'],
-                        'ETH': ['ETH', 'ETHEREUM'],
-                        'SOL': ['SOL', 'SOLANA'],
-                        'XRP': ['XRP', 'RIPPLE']
-                    }
-                    
-                    keywords = crypto_keywords.get(crypto_upper, [crypto_upper])
-                    if not any(kw in title.upper() for kw in keywords):
-                        continue
-                    
-                    # 检查是否包含15分钟的特征
-                    # 新格式: "Bitcoin Up or Down - December 26, 10:30AM-10:45AM ET"
-                    # 旧格式: "Bitcoin Up or Down - September 15, 10:30AM-10:45AM ET"
-                    if 'AM-' not in title and 'PM-' not in title:
-                        continue
-                    
-                    # 尝试获取完整市场信息（包括 closed 状态和 endDate）
-                    # 如果失败，使用基本信息
-                    end_date = None
-                    closed = False
-                    active = False
-                    accepting_orders = False
-                    
-                    try:
-                        market_url = f"{self.GAMMA_API_BASE}/events?slug={slug}"
-                        market_response = await client.get(market_url, timeout=3)
-                        
-                        if market_response.status_code == 200:
-                            market_data = market_response.json()
-                            if market_data and len(market_data) > 0:
-                                event = market_data[0]
-                                markets = event.get('markets', [])
-                                
-                                if markets and len(markets) > 0:
-                                    market = markets[0]
-                                    end_date = market.get('endDate')
-                                    closed = market.get('closed', False)
-                                    active = market.get('active', False)
-                                    accepting_orders = market.get('acceptingOrders', False)
-                    except:
-                        pass  # 如果获取失败，继续使用基本信息
-                    
-                    market_info = MarketInfo(
-                        condition_id=condition_id,
-                        question=title,
-                        slug=slug,
-                        end_date=end_date,
-                        closed=closed,
-                        active=active,
-                        accepting_orders=accepting_orders
-                    )
-                    
-                    seen_markets[condition_id] = market_info
-                    
-                    if len(seen_markets) >= limit:
-                        break
-                        
-                except Exception as e:
-                    logger.warning(f"处理交易数据失败: {e}")
+            for trade in trades_data:
+                # 只看最近N小时的交易
+                if (trade.get('timestamp') or 0) < cutoff_timestamp:
+                    continue
+                recent_count += 1
+                
+                # 逐项读取字段并尽早跳过：先去重，再按标题筛选，最后才读取 slug
+                condition_id = trade.get('conditionId')
+                if not condition_id or condition_id in seen_ids:
                     continue
+                
+                # 检查是否是指定加密货币的15分钟市场
+                title = trade.get('title') or ''
+                title_upper = title.upper()
+                if not any(kw in title_upper for kw in keywords):
+                    continue
+                
+                # 检查是否包含15分钟的特征
+                # 新格式: "Bitcoin Up or Down - December 26, 10:30AM-10:45AM ET"
+                # 旧格式: "Bitcoin Up or Down - September 15, 10:30AM-10:45AM ET"
+                if not _AMPM_RANGE_PATTERN.search(title):
+                    continue
+                
+                seen_ids.add(condition_id)
+                pending.append((condition_id, title, trade.get('slug') or ''))
+                
+                if len(pending) >= limit:
+                    break
+            
+            logger.info(f"检查了最近 {hours} 小时内的 {recent_count} 笔交易")
+            # 原始交易字典已不再需要，在等待事件详情期间释放
+            del trades_data
+            
+            # 并发获取各市场的完整信息（包括 closed 状态和 endDate），失败的使用基本信息
+            semaphore = asyncio.Semaphore(self.EVENT_FETCH_CONCURRENCY)
+            event_markets = await asyncio.gather(*(
+                self._fetch_event_market(slug, semaphore)
+                for _, _, slug in pending
+            ))
             
-            # 转换为列表并排序
-            markets = list(seen_markets.values())
-            markets.sort(
-                key=lambda m: m.end_date if m.end_date else '',
-                reverse=True
-            )
+            markets = []
+            for (condition_id, title, slug), market in zip(pending, event_markets):
+                market = market or {}
+                markets.append(MarketInfo(
+                    condition_id=condition_id,
+                    question=title,
+                    slug=slug,
+                    end_date=market.get('endDate'),
+                    closed=market.get('closed', False),
+                    active=market.get('active', False),
+                    accepting_orders=market.get('acceptingOrders', False)
+                ))
+            
+            # 排序
+            markets.sort(key=_end_date_key, reverse=True)
             
             logger.info(f"✓ 从交易中提取到 {len(markets)} 个 {crypto} 15分钟市场")
             
@@ -221,112 +349,104 @@ class MarketSearcher:
             logger.error(f"搜索市场失败: {e}")
             return []
     
-    async def get_recent_closed_btc_15min_markets(
+    async def _get_markets_pages(self, url: str, params: Dict) -> Any:
+        """
+        按 offset 并行分页获取 /markets 列表
+        
+        limit 不超过 MARKETS_PAGE_SIZE 时只发一次请求；否则拆成多页并发请求后
+        按 offset 顺序拼接。部分页失败时跳过该页，全部失败时抛出第一个异常
+        
+        Returns:
+            市场列表；单页请求失败（非 200 且无缓存）时返回 None
+        """
+        page_size = self.MARKETS_PAGE_SIZE
+        total = int(params.get('limit', page_size))
+        if total <= page_size:
+            return await self._get_json(url, params, ttl=self.MARKETS_CACHE_TTL, timeout=10)
+        
+        base_offset = int(params.get('offset', 0))
+        semaphore = asyncio.Semaphore(self.EVENT_FETCH_CONCURRENCY)
+        
+        async def fetch_page(offset: int) -> Any:
+            page_params = dict(params)
+            page_params['offset'] = offset
+            page_params['limit'] = min(page_size, base_offset + total - offset)
+            async with semaphore:
+                return await self._get_json(url, page_params, ttl=self.MARKETS_CACHE_TTL, timeout=10)
+        
+        pages = await asyncio.gather(
+            *(fetch_page(offset) for offset in range(base_offset, base_offset + total, page_size)),
+            return_exceptions=True
+        )
+        
+        markets = []
+        errors = []
+        for page in pages:
+            if isinstance(page, BaseException):
+                errors.append(page)
+            elif isinstance(page, list):
+                markets.extend(page)
+        
+        if errors:
+            if len(errors) == len(pages):
+                raise errors[0]
+            logger.warning(f"{len(errors)}/{len(pages)} 页市场数据获取失败: {errors[0]}")
+        
+        return markets
+    
+    async def _query_markets(
         self,
-        days: int = 7,
-        limit: int = 20
+        params: Dict,
+        title_filter: Callable[[str], bool],
+        market_filter: Optional[Callable[[MarketInfo], bool]] = None
     ) -> List[MarketInfo]:
         """
-        获取最近关闭的 BTC 15分钟市场（优先获取最新的）
+        获取 /markets 列表并筛选为 MarketInfo（三个搜索方法共用）
         
         Args:
-            days: 最近几天内（默认7天，0表示不限制）
-            limit: 返回数量限制
+            params: /markets 查询参数
+            title_filter: 按标题筛选（在构造 MarketInfo 之前执行）
+            market_filter: 可选，按构造后的 MarketInfo 再筛选（如结束时间）
         
         Returns:
-            市场信息列表（按关闭时间从新到旧排序）
+            有 conditionId 的市场列表（未排序），请求失败时返回空列表
         """
-        from datetime import datetime, timedelta
-        
-        client = await self._ensure_client()
-        
         url = f"{self.GAMMA_API_BASE}/markets"
-        params = {
-            "tag_id": "102467",  # BTC/ETH 15分钟市场标签
-            "closed": "true",
-            "limit": 500  # 增加到500以获取更多市场
-        }
         
         try:
-            logger.info(f"搜索最近 {days if days > 0 else '所有'} 天内关闭的 BTC 15分钟市场...")
-            response = await client.get(url, params=params, timeout=10)
-            
-            if response.status_code != 200:
-                logger.error(f"API 请求失败: {response.status_code}")
+            data = await self._get_markets_pages(url, params)
+            if data is None:
                 return []
             
-            data = response.json()
             markets_data = data if isinstance(data, list) else []
             
-            logger.info(f"API 返回 {len(markets_data)} 个市场")
-            
-            # 调试：显示前几个和最后几个市场的日期
-            if markets_data:
-                logger.info(f"第一个市场: {markets_data[0].get('question', 'N/A')[:50]}, endDate: {markets_data[0].get('endDate')}")
-                if len(markets_data) > 1:
-                    logger.info(f"最后一个市场: {markets_data[-1].get('question', 'N/A')[:50]}, endDate: {markets_data[-1].get('endDate')}")
-            
-            # 计算时间阈值
-            if days > 0:
-                cutoff_time = datetime.now() - timedelta(days=days)
-                cutoff_timestamp = cutoff_time.timestamp()
-            else:
-                cutoff_timestamp = 0
+            logger.info(f"API 返回 {len(markets_data)} 个市场，开始筛选...")
             
             # 解析并筛选市场
             markets = []
             for m in markets_data:
-                try:
-                    question = m.get('question', '')
-                    
-                    # 筛选 BTC 相关
-                    if 'BTC' not in question.upper() and 'BITCOIN' not in question.upper():
-                        continue
-                    
-                    # 筛选 15分钟相关
-                    if '15' not in question and 'fifteen' not in question.lower():
-                        continue
-                    
-                    # 解析结束时间
-                    end_date = m.get('endDate')
-                    
-                    # 如果设置了时间限制，筛选最近的
-                    if days > 0 and end_date:
-                        try:
-                            # endDate 格式: "2025-09-13T05:30:00.000Z"
-                            end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                            if end_datetime.timestamp() < cutoff_timestamp:
-                                continue  # 太旧，跳过
-                        except:
-                            pass  # 解析失败，保留该市场
-                    
-                    market = MarketInfo(
-                        condition_id=m.get('conditionId', ''),
-                        question=question,
-                        slug=m.get('slug', ''),
-                        end_date=end_date,
-                        closed=m.get('closed', False),
-                        active=m.get('active', False),
-                        accepting_orders=m.get('acceptingOrders', False)
-                    )
-                    
-                    if market.condition_id:
-                        markets.append(market)
-                        
-                except Exception as e:
-                    logger.warning(f"解析市场数据失败: {e}")
+                question = m.get('question') or ''
+                if not title_filter(question):
                     continue
-            
-            # 按结束时间排序（最新的在前）
-            markets.sort(
-                key=lambda m: m.end_date if m.end_date else '',
-                reverse=True
-            )
-            
-            # 限制返回数量
-            markets = markets[:limit]
-            
-            logger.info(f"✓ 找到 {len(markets)} 个最近关闭的 BTC 15分钟市场")
+                
+                condition_id = m.get('conditionId')
+                if not condition_id:  # 确保有 condition_id
+                    continue
+                
+                market = MarketInfo(
+                    condition_id=condition_id,
+                    question=question,
+                    slug=m.get('slug') or '',
+                    end_date=m.get('endDate'),
+                    closed=m.get('closed', False),
+                    active=m.get('active', False),
+                    accepting_orders=m.get('acceptingOrders', False)
+                )
+                
+                if market_filter is not None and not market_filter(market):
+                    continue
+                
+                markets.append(market)
             
             return markets
             
@@ -334,6 +454,46 @@ class MarketSearcher:
             logger.error(f"搜索市场失败: {e}")
             return []
     
+    async def get_recent_closed_btc_15min_markets(
+        self,
+        days: int = 7,
+        limit: int = 20
+    ) -> List[MarketInfo]:
+        """
+        获取最近关闭的 BTC 15分钟市场（优先获取最新的）
+        
+        Args:
+            days: 最近几天内（默认7天，0表示不限制）
+            limit: 返回数量限制
+        
+        Returns:
+            市场信息列表（按关闭时间从新到旧排序）
+        """
+        logger.info(f"搜索最近 {days if days > 0 else '所有'} 天内关闭的 BTC 15分钟市场...")
+        
+        # 如果设置了时间限制，筛选最近的（没有或无法解析结束时间的保留）
+        market_filter = None
+        if days > 0:
+            cutoff_timestamp = (datetime.now() - timedelta(days=days)).timestamp()
+            market_filter = lambda market: not 0 <= market.end_ts < cutoff_timestamp
+        
+        markets = await self._query_markets(
+            {
+                "tag_id": "102467",  # BTC/ETH 15分钟市场标签
+                "closed": "true",
+                "limit": 500  # 500 个市场，按 MARKETS_PAGE_SIZE 分页并行获取
+            },
+            _is_btc_15min_title,
+            market_filter
+        )
+        
+        # 只取结束时间最新的 limit 个（结果与完整排序后截取一致）
+        markets = heapq.nlargest(limit, markets, key=_end_date_key)
+        
+        logger.info(f"✓ 找到 {len(markets)} 个最近关闭的 BTC 15分钟市场")
+        
+        return markets
+    
     async def search_btc_15min_markets(
         self,
         closed: bool = True,
@@ -349,71 +509,23 @@ class MarketSearcher:
         Returns:
             市场信息列表
         """
-        client = await self._ensure_client()
+        logger.info(f"搜索 BTC 15分钟市场（closed={closed}）...")
         
-        url = f"{self.GAMMA_API_BASE}/markets"
-        params = {
-            "tag_id": "102467",  # BTC/ETH 15分钟市场标签
-            "closed": "true" if closed else "false",
-            "limit": limit
-        }
+        markets = await self._query_markets(
+            {
+                "tag_id": "102467",  # BTC/ETH 15分钟市场标签
+                "closed": "true" if closed else "false",
+                "limit": limit
+            },
+            _is_btc_15min_title
+        )
         
-        try:
-            logger.info(f"搜索 BTC 15分钟市场（closed={closed}）...")
-            response = await client.get(url, params=params, timeout=10)
-            
-            if response.status_code != 200:
-                logger.error(f"API 请求失败: {response.status_code}")
-                return []
-            
-            data = response.json()
-            markets_data = data if isinstance(data, list) else []
-            
-            logger.info(f"找到 {len(markets_data)} 个市场")
-            
-            # 解析市场信息
-            markets = []
-            for m in markets_data:
-                try:
-                    # 只筛选 BTC 相关的市场
-                    question = m.get('question', '')
-                    if 'BTC' not in question.upper() and 'BITCOIN' not in question.upper():
-                        continue
-                    
-                    # 只筛选 15分钟相关的市场
-                    if '15' not in question and 'fifteen' not in question.lower():
-                        continue
-                    
-                    market = MarketInfo(
-                        condition_id=m.get('conditionId', ''),
-                        question=question,
-                        slug=m.get('slug', ''),
-                        end_date=m.get('endDate'),
-                        closed=m.get('closed', False),
-                        active=m.get('active', False),
-                        accepting_orders=m.get('acceptingOrders', False)
-                    )
-                    
-                    if market.condition_id:  # 确保有 condition_id
-                        markets.append(market)
-                        
-                except Exception as e:
-                    logger.warning(f"解析市场数据失败: {e}")
-                    continue
-            
-            # 按结束时间排序（最新的在前）
-            markets.sort(
-                key=lambda m: m.end_date if m.end_date else '',
-                reverse=True
-            )
-            
-            logger.info(f"✓ 筛选后剩余 {len(markets)} 个 BTC 15分钟市场")
-            
-            return markets
-            
-        except Exception as e:
-            logger.error(f"搜索市场失败: {e}")
-            return []
+        # 按结束时间排序（最新的在前）
+        markets.sort(key=_end_date_key, reverse=True)
+        
+        logger.info(f"✓ 筛选后剩余 {len(markets)} 个 BTC 15分钟市场")
+        
+        return markets
     
     async def search_markets_by_keyword(
         self,
@@ -432,71 +544,24 @@ class MarketSearcher:
         Returns:
             市场信息列表
         """
-        client = await self._ensure_client()
+        logger.info(f"搜索包含关键词 '{keyword}' 的市场（closed={closed}）...")
         
-        # 使用 Gamma API 搜索
-        url = f"{self.GAMMA_API_BASE}/markets"
-        params = {
-            "closed": "true" if closed else "false",
-            "limit": limit
-        }
+        # 关键词匹配（不区分大小写）
+        keyword_upper = keyword.upper()
+        markets = await self._query_markets(
+            {
+                "closed": "true" if closed else "false",
+                "limit": limit
+            },
+            lambda question: keyword_upper in question.upper()
+        )
         
-        try:
-            logger.info(f"搜索包含关键词 '{keyword}' 的市场（closed={closed}）...")
-            response = await client.get(url, params=params, timeout=10)
-            
-            if response.status_code != 200:
-                logger.error(f"API 请求失败: {response.status_code}")
-                return []
-            
-            data = response.json()
-            markets_data = data if isinstance(data, list) else []
-            
-            logger.info(f"获取到 {len(markets_data)} 个市场，开始筛选...")
-            
-            # 关键词筛选
-            keyword_upper = keyword.upper()
-            markets = []
-            
-            for m in markets_data:
-                try:
-                    question = m.get('question', '')
-                    
-                    # 关键词匹配
-                    if keyword_upper not in question.upper():
-                        continue
-                    
-                    market = MarketInfo(
-                        condition_id=m.get('conditionId', ''),
-                        question=question,
-                        slug=m.get('slug', ''),
-                        end_date=m.get('endDate'),
-                        closed=m.get('closed', False),
-                        active=m.get('active', False),
-                        accepting_orders=m.get('acceptingOrders', False)
-                    )
-                    
-                    if market.condition_id:
-                        markets.append(market)
-                        
-                except Exception as e:
-                    logger.warning(f"解析市场数据失败: {e}")
-                    continue
-            
-            # 按结束时间排序
-            markets.sort(
-                key=lambda m: m.end_date if m.end_date else '',
-                reverse=True
-            )
-            
-            logger.info(f"✓ 筛选后剩余 {len(markets)} 个包含 '{keyword}' 的市场")
-            
-            return markets
-            
-        except Exception as e:
-            logger.error(f"搜索市场失败: {e}")
-            return []
-
+        # 按结束时间排序
+        markets.sort(key=_end_date_key, reverse=True)
+        
+        logger.info(f"✓ 筛选后剩余 {len(markets)} 个包含 '{keyword}' 的市场")
+        
+        return markets
 
 async def main():
     """测试函数"""
@@ -531,7 +596,7 @@ async def main():
         
         if btc_15_markets:
             # 按时间排序
-            btc_15_markets.sort(key=lambda m: m.end_date if m.end_date else '', reverse=True)
+            btc_15_markets.sort(key=_end_date_key, reverse=True)
             
             print("最新的10个:")
             for i, market in enumerate(btc_15_markets[:10], 1):
@@ -5,16 +5,84 @@ Polymarket API 客户端
 import asyncio
 import json
 import re
+import traceback
 from typing import Dict, List, Optional, Callable
 from dataclasses import dataclass
 from datetime import datetime, timezone
 import httpx
 from websockets import connect
 import logging
+from src.market.json_codec import decode_json, json_loads
 
 logger = logging.getLogger(__name__)
 
 
+def _keywords_pattern(*keywords: str) -> "re.Pattern":
+    """将一组关键词编译为一个正则（任一关键词作为子串出现即匹配）"""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+# find_btc_eth_markets 的筛选规则：每组关键词预编译为一个正则，每个标题每组只扫描一遍
+_CRYPTO_PATTERN = _keywords_pattern("btc", "bitcoin", "eth", "ethereum")
+_UPDOWN_PATTERN = _keywords_pattern("up or down", "up/down")
+_TIME_RANGE_PATTERN = re.compile(r'\d{1,2}:\d{2}-\d{1,2}:\d{2}')  # 15分钟时间格式（如 11:30-11:45）
+_15MIN_KEYWORD_PATTERN = _keywords_pattern(
+    "15 min", "15min", "15-minute", "15 minute",
+    "fifteen min", "fifteen-minute", "15m"
+)
+_DIRECTION_PATTERN = _keywords_pattern(
+    "up", "down", "above", "below",
+    "higher", "lower", "rise", "fall"
+)
+_EXCLUDE_PATTERN = _keywords_pattern(
+    "ncaab", "nfl", "nba", "mlb", "soccer", "football",
+    "election", "president", "trump", "biden",
+    "stock", "sp500", "nasdaq", "price will hit",  # 排除价格预测市场
+    "will hit", "before 2026", "in 2025"  # 排除长期预测
+)
+
+# 五位一体标签基因库 - 确保只返回真正的 BTC/ETH 15分钟市场
+# 注意：如果 API 返回的数据中没有 tags 字段，我们至少需要 tag_id=102467（已通过 API 筛选）
+_TARGET_TAGS = frozenset({"102467", "101757", "21", "102169", "102127"})
+_REQUIRED_TAG = "102467"  # 必须包含的标签（已通过 API 参数筛选）
+
+# 排序时代替缺失的结束时间（UTC aware，可与其他结束时间比较）
+_DT_MAX_UTC = datetime.max.replace(tzinfo=timezone.utc)
+# Polymarket 结束时间的常见格式 "YYYY-MM-DDTHH:MM:SSZ"
+_ISO_UTC_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})Z', re.ASCII)
+
+
+def _parse_polymarket_ts(value: str) -> Optional[datetime]:
+    """
+    解析 Polymarket 的结束时间为 UTC aware datetime
+    
+    常见格式 "YYYY-MM-DDTHH:MM:SSZ" 用预编译正则直接取出各字段构造；其他格式退回到
+    fromisoformat / strptime，都无法解析时返回 None
+    """
+    if not isinstance(value, str):
+        return None
+    match = _ISO_UTC_PATTERN.fullmatch(value)
+    if match:
+        try:
+            return datetime(*map(int, match.groups()), tzinfo=timezone.utc)
+        except ValueError:
+            pass  # 数值越界（如 2 月 30 日），交给下面的通用解析
+    
+    try:
+        end_date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            # 如果解析失败，尝试手动解析
+            end_date = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+        except ValueError:
+            return None
+    
+    # 确保是 aware 的
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=timezone.utc)
+    return end_date
+
+
 @dataclass
 class Market:
     """市场信息"""
@@ -29,6 +97,8 @@ class Market:
 @dataclass
 class OrderBookLevel:
     """订单簿层级"""
+    __slots__ = ('price', 'qty')
+    
     price: float
     qty: float
 
@@ -81,6 +151,8 @@ class PolymarketAPI:
         """
         self.api_key = api_key
         self.client: Optional[httpx.AsyncClient] = None
+        # client 所绑定的事件循环，事件循环变化时才重建 client
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
         self.ws: Optional[any] = None
         self.is_connected = False
         # timeout 配置（增加超时时间以应对网络延迟）
@@ -99,6 +171,7 @@ class PolymarketAPI:
         if self.client:
             await self.client.aclose()
             self.client = None
+            self._client_loop = None
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
@@ -109,35 +182,35 @@ class PolymarketAPI:
         """异步上下文管理器出口"""
         if self.client:
             await self.client.aclose()
+            self.client = None
+            self._client_loop = None
         if self.ws:
             await self.ws.close()
     
     async def _get_client(self) -> httpx.AsyncClient:
         """获取或创建 httpx client（确保在当前事件循环中）"""
-        # 每次都在当前事件循环中创建新的 client，避免事件循环绑定问题
-        # 这是为了兼容 Streamlit 中可能存在的多个事件循环
-        # 不重用 client，每次都创建新的，确保绑定到当前事件循环
-        try:
-            # 尝试关闭旧的 client（如果存在）
-            if self.client is not None:
-                try:
-                    await self.client.aclose()
-                except:
-                    pass
-        except:
-            pass
+        # 同一事件循环内复用同一个 client，保留连接池中已建立的 TCP/TLS 连接
+        # Streamlit 中可能存在多个事件循环：事件循环变化时才关闭旧 client 并重建
+        loop = asyncio.get_running_loop()
+        if self.client is not None and self._client_loop is loop and not self.client.is_closed:
+            return self.client
         
-        # 总是在当前事件循环中创建新的 client
-        # 使用 contextvars 来确保 client 绑定到当前事件循环
-        # 配置更长的超时时间和重试设置
+        if self.client is not None:
+            # 旧 client 绑定在其他（可能已关闭的）事件循环上，关闭失败可以忽略
+            try:
+                await self.client.aclose()
+            except Exception:
+                pass
+        
+        # 配置更长的超时时间；空闲连接保持 60 秒，复用已建立的连接
         timeout = httpx.Timeout(self.timeout_seconds, connect=10.0)  # 连接超时 10 秒，总超时 30 秒
         self.client = httpx.AsyncClient(
             timeout=timeout,
-            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0),
             verify=False,  # 禁用 SSL 验证（Python 3.13 在 macOS 上有 SSL 兼容性问题）
-            # http2=True,  # 已移除：需要安装 httpx[http2]，HTTP/1.1 也能正常工作
             follow_redirects=True  # 跟随重定向
         )
+        self._client_loop = loop
         return self.client
     
     async def _graphql_query(self, query: str, variables: Optional[Dict] = None) -> Dict:
@@ -164,7 +237,7 @@ class PolymarketAPI:
             error_text = response.text
             logger.error(f"GraphQL query failed: {response.status_code}, Response: {error_text[:200]}")
             raise Exception(f"GraphQL query failed: {response.status_code}")
-        return response.json()
+        return decode_json(response)
     
     async def search_markets(
         self,
@@ -187,11 +260,6 @@ class PolymarketAPI:
         Returns:
             市场列表（精确筛选的 BTC/ETH 15分钟市场）
         """
-        # 五位一体标签基因库 - 确保只返回真正的 BTC/ETH 15分钟市场
-        # 注意：如果 API 返回的数据中没有 tags 字段，我们至少需要 tag_id=102467（已通过 API 筛选）
-        TARGET_TAGS = {"102467", "101757", "21", "102169", "102127"}
-        REQUIRED_TAG = "102467"  # 必须包含的标签（已通过 API 参数筛选）
-        
         # 使用 Gamma API 获取市场（tag_id=102467 作为基础筛选）
         url = "https://gamma-api.polymarket.com/markets"
         params = {
@@ -206,7 +274,7 @@ class PolymarketAPI:
             # 调试：记录请求信息
             full_url = f"{url}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
             logger.info(f"🔍 请求 Gamma API: {full_url}")
-            logger.info(f"📋 目标标签: {TARGET_TAGS}")
+            logger.info(f"📋 目标标签: {set(_TARGET_TAGS)}")
             
             response = await client.get(url, params=params, timeout=self.timeout_seconds)
             
@@ -215,69 +283,72 @@ class PolymarketAPI:
                 logger.error(f"响应内容: {response.text[:500]}")
                 return []
             
-            data = response.json()
+            data = decode_json(response)
             # Gamma API 直接返回市场数组
             markets_data = data if isinstance(data, list) else []
             
             logger.info(f"📊 API 返回了 {len(markets_data)} 个市场（原始数据）")
             
+            # 逐市场的诊断日志只在 DEBUG 级别输出；先判断一次级别，避免在
+            # 未开启 DEBUG 时仍然格式化字符串、序列化 JSON
+            debug = logger.isEnabledFor(logging.DEBUG)
+            
             # 调试：显示第一个市场的完整原始数据结构
-            if markets_data:
-                logger.info("🔍 第一个市场的完整原始数据（过滤前）:")
+            if debug and markets_data:
+                logger.debug("🔍 第一个市场的完整原始数据（过滤前）:")
                 first_market = markets_data[0]
-                logger.info(f"  问题: {first_market.get('question', 'N/A')}")
-                logger.info(f"  所有字段: {list(first_market.keys())}")
+                logger.debug(f"  问题: {first_market.get('question', 'N/A')}")
+                logger.debug(f"  所有字段: {list(first_market.keys())}")
                 
                 # 检查 tags 字段的不同可能位置
                 tags_raw = first_market.get('tags', None)
-                logger.info(f"  tags 字段（原始）: {tags_raw}")
-                logger.info(f"  tags 类型: {type(tags_raw)}")
+                logger.debug(f"  tags 字段（原始）: {tags_raw}")
+                logger.debug(f"  tags 类型: {type(tags_raw)}")
                 
                 # 检查是否有其他可能的标签字段
                 if 'tag' in first_market:
-                    logger.info(f"  tag 字段: {first_market.get('tag')}")
+                    logger.debug(f"  tag 字段: {first_market.get('tag')}")
                 if 'tagIds' in first_market:
-                    logger.info(f"  tagIds 字段: {first_market.get('tagIds')}")
+                    logger.debug(f"  tagIds 字段: {first_market.get('tagIds')}")
                 if 'tag_ids' in first_market:
-                    logger.info(f"  tag_ids 字段: {first_market.get('tag_ids')}")
+                    logger.debug(f"  tag_ids 字段: {first_market.get('tag_ids')}")
                 
                 # 检查 series 字段（可能包含标签信息）
                 if 'series' in first_market:
                     series = first_market.get('series', [])
                     if series and isinstance(series, list) and len(series) > 0:
-                        logger.info(f"  series[0] 字段: {list(series[0].keys()) if isinstance(series[0], dict) else 'not a dict'}")
+                        logger.debug(f"  series[0] 字段: {list(series[0].keys()) if isinstance(series[0], dict) else 'not a dict'}")
                         if isinstance(series[0], dict):
-                            logger.info(f"  series[0] 完整内容: {series[0]}")
+                            logger.debug(f"  series[0] 完整内容: {series[0]}")
                 
                 # 显示其他重要字段
-                logger.info(f"  closed: {first_market.get('closed')}")
-                logger.info(f"  acceptingOrders: {first_market.get('acceptingOrders')}")
-                logger.info(f"  active: {first_market.get('active')}")
-                logger.info(f"  endDate: {first_market.get('endDate')}")
-                logger.info(f"  conditionId: {first_market.get('conditionId')}")
-                logger.info(f"  slug: {first_market.get('slug')}")
+                logger.debug(f"  closed: {first_market.get('closed')}")
+                logger.debug(f"  acceptingOrders: {first_market.get('acceptingOrders')}")
+                logger.debug(f"  active: {first_market.get('active')}")
+                logger.debug(f"  endDate: {first_market.get('endDate')}")
+                logger.debug(f"  conditionId: {first_market.get('conditionId')}")
+                logger.debug(f"  slug: {first_market.get('slug')}")
                 
                 # 如果有 events 字段，也检查一下
                 if 'events' in first_market:
                     events = first_market.get('events', [])
                     if events and len(events) > 0:
-                        logger.info(f"  events[0] 字段: {list(events[0].keys()) if isinstance(events[0], dict) else 'not a dict'}")
+                        logger.debug(f"  events[0] 字段: {list(events[0].keys()) if isinstance(events[0], dict) else 'not a dict'}")
                         if isinstance(events[0], dict):
-                            logger.info(f"  events[0] 完整内容: {events[0]}")
+                            logger.debug(f"  events[0] 完整内容: {events[0]}")
                             if 'tags' in events[0]:
-                                logger.info(f"  events[0].tags: {events[0].get('tags')}")
+                                logger.debug(f"  events[0].tags: {events[0].get('tags')}")
                             if 'series' in events[0]:
                                 series = events[0].get('series')
                                 if series and isinstance(series, dict):
-                                    logger.info(f"  events[0].series: {series}")
+                                    logger.debug(f"  events[0].series: {series}")
                 
                 # 打印完整的 JSON 结构（前500字符）用于调试
-                import json
-                logger.info(f"  完整 JSON（前500字符）: {json.dumps(first_market, indent=2, default=str)[:500]}")
+                logger.debug(f"  完整 JSON（前500字符）: {json.dumps(first_market, indent=2, default=str)[:500]}")
             
             # 调试：显示前几个市场的标签信息（如果 tags 字段存在）
-            if markets_data:
-                logger.info("🔍 前3个市场的标签信息:")
+            if debug and markets_data:
+                logger.debug("🔍 前3个市场的标签信息:")
                 for i, m in enumerate(markets_data[:3]):
                     # 尝试多种方式获取标签
                     tags_list = m.get('tags', [])
@@ -296,97 +367,85 @@ class PolymarketAPI:
                             elif isinstance(tag, (str, int)):
                                 market_tags.add(str(tag))
                     
-                    logger.info(f"  市场 {i+1}: {m.get('question', 'N/A')[:50]}")
-                    logger.info(f"    标签列表（原始）: {tags_list}")
-                    logger.info(f"    解析后的标签ID: {market_tags}")
-                    logger.info(f"    是否包含所有目标标签: {TARGET_TAGS.issubset(market_tags)}")
-                    logger.info(f"    closed: {m.get('closed')}, acceptingOrders: {m.get('acceptingOrders')}, active: {m.get('active')}")
+                    logger.debug(f"  市场 {i+1}: {m.get('question', 'N/A')[:50]}")
+                    logger.debug(f"    标签列表（原始）: {tags_list}")
+                    logger.debug(f"    解析后的标签ID: {market_tags}")
+                    logger.debug(f"    是否包含所有目标标签: {_TARGET_TAGS.issubset(market_tags)}")
+                    logger.debug(f"    closed: {m.get('closed')}, acceptingOrders: {m.get('acceptingOrders')}, active: {m.get('active')}")
                     if m.get('endDate'):
-                        logger.info(f"    endDate: {m.get('endDate')}")
+                        logger.debug(f"    endDate: {m.get('endDate')}")
             
             markets = []
             now = datetime.now(timezone.utc)  # 使用 UTC aware datetime
+            now_ts = now.timestamp()  # 逐个市场比较结束时间时直接比较时间戳
             skipped_tags = 0
             skipped_closed = 0
             skipped_not_accepting = 0
             skipped_expired = 0
             
-            # 详细统计每个市场被过滤的原因
+            # 详细统计每个市场被过滤的原因（仅 DEBUG 时收集）
             skip_reasons = []
             
             logger.info(f"\n🔍 开始逐个检查 {len(markets_data)} 个市场...\n")
             
             for idx, m in enumerate(markets_data, 1):
                 try:
-                    market_question = m.get('question', 'N/A')[:60]
-                    logger.info(f"--- 市场 {idx}/{len(markets_data)}: {market_question} ---")
-                    # 获取当前市场所有 Tag 的 ID（尝试多种方式）
-                    tags_list = m.get('tags', [])
-                    
-                    # 如果 tags 字段不存在，尝试从 events 中获取
-                    if not tags_list and 'events' in m:
-                        events = m.get('events', [])
-                        if events and isinstance(events[0], dict):
-                            tags_list = events[0].get('tags', [])
-                            # 如果 events[0] 中有 series，也检查 series 中的标签
-                            if not tags_list and 'series' in events[0]:
-                                series = events[0].get('series')
-                                if isinstance(series, dict) and 'tags' in series:
-                                    tags_list = series.get('tags', [])
-                    
-                    # 如果还是没有，尝试从顶层的 series 字段获取
-                    if not tags_list and 'series' in m:
-                        series = m.get('series')
-                        if isinstance(series, list) and len(series) > 0 and isinstance(series[0], dict):
-                            if 'tags' in series[0]:
-                                tags_list = series[0].get('tags', [])
-                    
-                    # 解析标签 ID
-                    current_tags = set()
-                    if isinstance(tags_list, list) and len(tags_list) > 0:
-                        for tag in tags_list:
-                            if isinstance(tag, dict):
-                                tag_id = tag.get('id') or tag.get('tagId') or tag.get('tag_id')
-                                if tag_id:
-                                    current_tags.add(str(tag_id))
-                            elif isinstance(tag, (str, int)):
-                                current_tags.add(str(tag))
-                    
-                    # 如果 tags 仍然为空，但这是通过 tag_id=102467 筛选出来的
-                    # 说明这些市场确实有 102467 标签，但 API 没有返回完整的标签信息
-                    if not current_tags:
-                        logger.info(f"  ⚠️  市场 {idx} 的 tags 字段为空")
-                        logger.info(f"     但这是通过 tag_id={REQUIRED_TAG} 筛选出来的，说明确实包含该标签")
-                        # 添加 102467 标签（因为是通过这个 tag_id 筛选出来的）
-                        current_tags.add(REQUIRED_TAG)
-                        logger.info(f"     已添加 {REQUIRED_TAG} 标签到当前标签集合: {current_tags}")
-                    
-                    # 调试：记录标签匹配情况
-                    # 标签检查已禁用 - 不再因标签不匹配而跳过市场
-                    logger.info(f"  ✅ 标签检查已跳过（当前标签: {current_tags}，原始 tags: {tags_list}）")
-                    # 继续后续检查，不跳过
+                    if debug:
+                        market_question = m.get('question', 'N/A')[:60]
+                        logger.debug(f"--- 市场 {idx}/{len(markets_data)}: {market_question} ---")
+                        # 标签检查已禁用，标签只用于诊断输出
+                        # 获取当前市场所有 Tag 的 ID（尝试多种方式）
+                        tags_list = m.get('tags', [])
+                        
+                        # 如果 tags 字段不存在，尝试从 events 中获取
+                        if not tags_list and 'events' in m:
+                            events = m.get('events', [])
+                            if events and isinstance(events[0], dict):
+                                tags_list = events[0].get('tags', [])
+                                # 如果 events[0] 中有 series，也检查 series 中的标签
+                                if not tags_list and 'series' in events[0]:
+                                    series = events[0].get('series')
+                                    if isinstance(series, dict) and 'tags' in series:
+                                        tags_list = series.get('tags', [])
+                        
+                        # 如果还是没有，尝试从顶层的 series 字段获取
+                        if not tags_list and 'series' in m:
+                            series = m.get('series')
+                            if isinstance(series, list) and len(series) > 0 and isinstance(series[0], dict):
+                                if 'tags' in series[0]:
+                                    tags_list = series[0].get('tags', [])
+                        
+                        # 解析标签 ID
+                        current_tags = set()
+                        if isinstance(tags_list, list) and len(tags_list) > 0:
+                            for tag in tags_list:
+                                if isinstance(tag, dict):
+                                    tag_id = tag.get('id') or tag.get('tagId') or tag.get('tag_id')
+                                    if tag_id:
+                                        current_tags.add(str(tag_id))
+                                elif isinstance(tag, (str, int)):
+                                    current_tags.add(str(tag))
+                        
+                        # 如果 tags 仍然为空，但这是通过 tag_id=102467 筛选出来的
+                        # 说明这些市场确实有 102467 标签，但 API 没有返回完整的标签信息
+                        if not current_tags:
+                            logger.debug(f"  ⚠️  市场 {idx} 的 tags 字段为空")
+                            logger.debug(f"     但这是通过 tag_id={_REQUIRED_TAG} 筛选出来的，说明确实包含该标签")
+                            # 添加 102467 标签（因为是通过这个 tag_id 筛选出来的）
+                            current_tags.add(_REQUIRED_TAG)
+                            logger.debug(f"     已添加 {_REQUIRED_TAG} 标签到当前标签集合: {current_tags}")
+                        
+                        # 标签检查已禁用 - 不再因标签不匹配而跳过市场
+                        logger.debug(f"  ✅ 标签检查已跳过（当前标签: {current_tags}，原始 tags: {tags_list}）")
                     
                     # 解析结束时间（确保是 UTC aware）
-                    end_date = None
-                    if m.get("endDate"):
-                        try:
-                            end_date = datetime.fromisoformat(m.get("endDate").replace("Z", "+00:00"))
-                        except:
-                            try:
-                                # 如果解析失败，尝试手动解析并添加 UTC 时区
-                                end_date = datetime.strptime(m.get("endDate"), "%Y-%m-%dT%H:%M:%SZ")
-                                end_date = end_date.replace(tzinfo=timezone.utc)
-                            except:
-                                pass
-                    
-                    # 确保 end_date 是 aware 的
-                    if end_date and end_date.tzinfo is None:
-                        end_date = end_date.replace(tzinfo=timezone.utc)
+                    end_date_str = m.get("endDate")
+                    end_date = _parse_polymarket_ts(end_date_str) if end_date_str else None
                     
                     # 检查市场是否真正活跃
                     is_closed = m.get("closed", False)
                     is_accepting_orders = m.get("acceptingOrders", False)
-                    has_passed_end_date = end_date and end_date < now
+                    has_passed_end_date = end_date is not None and end_date.timestamp() < now_ts
                     
                     # 市场必须满足以下条件才算活跃：
                     # 1. 未关闭 (closed = false)
@@ -403,42 +462,34 @@ class PolymarketAPI:
                     if active and not is_truly_active:
                         if is_closed:
                             skipped_closed += 1
-                            reason = f"已关闭 (closed={is_closed})"
-                            skip_reasons.append({
-                                "market": market_question,
-                                "reason": reason,
-                                "details": {"closed": is_closed, "acceptingOrders": is_accepting_orders, "active": m.get('active')}
-                            })
-                            logger.info(f"  ❌ 跳过原因: {reason}")
+                            if debug:
+                                reason = f"已关闭 (closed={is_closed})"
+                                details = {"closed": is_closed, "acceptingOrders": is_accepting_orders, "active": m.get('active')}
                         elif not is_accepting_orders:
                             skipped_not_accepting += 1
-                            reason = f"未接受订单 (acceptingOrders={is_accepting_orders})"
-                            skip_reasons.append({
-                                "market": market_question,
-                                "reason": reason,
-                                "details": {"closed": is_closed, "acceptingOrders": is_accepting_orders, "active": m.get('active')}
-                            })
-                            logger.info(f"  ❌ 跳过原因: {reason}")
+                            if debug:
+                                reason = f"未接受订单 (acceptingOrders={is_accepting_orders})"
+                                details = {"closed": is_closed, "acceptingOrders": is_accepting_orders, "active": m.get('active')}
                         elif has_passed_end_date:
                             skipped_expired += 1
-                            reason = f"已过期 (endDate={m.get('endDate')}, now={now.isoformat()})"
-                            skip_reasons.append({
-                                "market": market_question,
-                                "reason": reason,
-                                "details": {"endDate": m.get('endDate'), "now": now.isoformat(), "has_passed": has_passed_end_date}
-                            })
-                            logger.info(f"  ❌ 跳过原因: {reason}")
-                        elif not m.get("active", False):
+                            if debug:
+                                reason = f"已过期 (endDate={m.get('endDate')}, now={now.isoformat()})"
+                                details = {"endDate": m.get('endDate'), "now": now.isoformat(), "has_passed": has_passed_end_date}
+                        elif debug:
                             reason = f"非活跃状态 (active={m.get('active')})"
+                            details = {"active": m.get('active')}
+                        
+                        if debug:
                             skip_reasons.append({
                                 "market": market_question,
                                 "reason": reason,
-                                "details": {"active": m.get('active')}
+                                "details": details
                             })
-                            logger.info(f"  ❌ 跳过原因: {reason}")
+                            logger.debug(f"  ❌ 跳过原因: {reason}")
                         continue
                     
-                    logger.info(f"  ✅ 市场通过所有检查，已添加到结果列表")
+                    if debug:
+                        logger.debug(f"  ✅ 市场通过所有检查，已添加到结果列表")
                     
                     # 构建 Market 对象
                     market = Market(
@@ -460,7 +511,6 @@ class PolymarketAPI:
                     logger.error(f"❌ 处理市场 {idx} 时发生错误: {market_question}")
                     logger.error(f"   错误类型: {type(e).__name__}")
                     logger.error(f"   错误信息: {e}")
-                    import traceback
                     logger.error(f"   错误堆栈:\n{traceback.format_exc()}")
                     continue
             
@@ -475,15 +525,17 @@ class PolymarketAPI:
             
             if len(markets) == 0:
                 logger.warning("\n⚠️  未找到符合条件的市场！")
-                logger.warning(f"\n📋 详细跳过原因列表（共 {len(skip_reasons)} 个市场）:")
-                for i, item in enumerate(skip_reasons[:10], 1):  # 显示前10个
-                    logger.warning(f"\n  {i}. {item['market']}")
-                    logger.warning(f"     原因: {item['reason']}")
-                    if 'details' in item:
-                        logger.warning(f"     详情: {item['details']}")
-                
-                if len(skip_reasons) > 10:
-                    logger.warning(f"\n  ... 还有 {len(skip_reasons) - 10} 个市场被跳过")
+                # 逐市场的跳过原因只在 DEBUG 时收集
+                if skip_reasons:
+                    logger.warning(f"\n📋 详细跳过原因列表（共 {len(skip_reasons)} 个市场）:")
+                    for i, item in enumerate(skip_reasons[:10], 1):  # 显示前10个
+                        logger.warning(f"\n  {i}. {item['market']}")
+                        logger.warning(f"     原因: {item['reason']}")
+                        if 'details' in item:
+                            logger.warning(f"     详情: {item['details']}")
+                    
+                    if len(skip_reasons) > 10:
+                        logger.warning(f"\n  ... 还有 {len(skip_reasons) - 10} 个市场被跳过")
                 
                 logger.warning(f"\n💡 建议检查:")
                 logger.warning(f"   1. API 是否返回了数据（返回了 {len(markets_data)} 个市场）")
@@ -503,7 +555,7 @@ class PolymarketAPI:
             
             # 按照结束时间排序，时间越早的越靠前
             # 注意：如果 end_date 为 None，放到最后
-            markets.sort(key=lambda m: (m.end_date is None, m.end_date or datetime.max.replace(tzinfo=timezone.utc)))
+            markets.sort(key=lambda m: (m.end_date is None, m.end_date or _DT_MAX_UTC))
             
             return markets
             
@@ -537,7 +589,6 @@ class PolymarketAPI:
         except Exception as e:
             logger.error(f"❌ 搜索市场时发生未知错误: {type(e).__name__}: {e}")
             logger.error(f"   请求 URL: {full_url}")
-            import traceback
             logger.error(f"   完整错误堆栈:\n{traceback.format_exc()}")
             return []
     
@@ -568,14 +619,12 @@ class PolymarketAPI:
                 }
             )
             response.raise_for_status()  # 如果状态码不是 2xx，会抛出异常
-            data = response.json()
+            data = decode_json(response)
             logger.info(f"✅ httpx 成功获取数据")
         except (httpx.ConnectError, httpx.TimeoutException) as e:
             # 如果 httpx 失败（可能是 Python 3.13 SSL 问题），使用 curl fallback
             logger.warning(f"httpx 连接失败，尝试使用 curl fallback: {e}")
             try:
-                import asyncio
-                import json as json_lib
                 import os
                 # 使用 asyncio subprocess 执行 curl（因为 Python 3.13 SSL 可能有兼容性问题）
                 # 清除可能影响 curl SSL 的环境变量
@@ -601,9 +650,9 @@ class PolymarketAPI:
                     
                     if process.returncode == 0 and stdout:
                         try:
-                            data = json_lib.loads(stdout.decode('utf-8'))
+                            data = json_loads(stdout)
                             logger.info(f"✅ 使用 curl fallback 成功获取数据")
-                        except json_lib.JSONDecodeError as je:
+                        except ValueError:
                             raise Exception(f"curl 返回的数据不是有效的 JSON: {stdout.decode('utf-8')[:200]}")
                     else:
                         error_msg = stderr.decode('utf-8') if stderr else f"curl 返回码: {process.returncode}"
@@ -633,10 +682,9 @@ class PolymarketAPI:
                 # 解析 clobTokenIds (JSON 字符串)
                 clob_token_ids = []
                 try:
-                    import json
                     token_ids_str = market.get("clobTokenIds", "[]")
                     if isinstance(token_ids_str, str):
-                        clob_token_ids = json.loads(token_ids_str)
+                        clob_token_ids = json_loads(token_ids_str)
                     elif isinstance(token_ids_str, list):
                         clob_token_ids = token_ids_str
                 except Exception as e:
@@ -649,7 +697,7 @@ class PolymarketAPI:
                     "slug": market.get("slug"),
                     "active": market.get("active"),
                     "closed": market.get("closed"),
-                    "outcomes": json.loads(market.get("outcomes", "[]")) if market.get("outcomes") else [],
+                    "outcomes": json_loads(market.get("outcomes", "[]")) if market.get("outcomes") else [],
                 }
                 logger.info(f"成功获取市场信息: conditionId={result.get('conditionId')}, clobTokenIds数量={len(clob_token_ids)}")
                 return result
@@ -857,7 +905,7 @@ class PolymarketAPI:
             
             response = await client.get(yes_url)
             if response.status_code == 200:
-                data = response.json()
+                data = decode_json(response)
                 logger.info(f"YES 订单簿响应: bids数量={len(data.get('bids', []))}, asks数量={len(data.get('asks', []))}")
                 # 解析订单簿数据
                 yes_bids = [
@@ -883,7 +931,7 @@ class PolymarketAPI:
             
             no_response = await client.get(no_url)
             if no_response.status_code == 200:
-                no_data = no_response.json()
+                no_data = decode_json(no_response)
                 logger.info(f"NO 订单簿响应: bids数量={len(no_data.get('bids', []))}, asks数量={len(no_data.get('asks', []))}")
                 no_bids = [
                     OrderBookLevel(price=float(bid["price"]), qty=float(bid["size"]))
@@ -1005,66 +1053,44 @@ class PolymarketAPI:
         filtered = []
         for market in markets:
             question_lower = market.question.lower()
+            
+            # 以下三种识别方式都要求包含 BTC/ETH，不满足的市场直接跳过
+            if not _CRYPTO_PATTERN.search(question_lower):
+                continue
+            
             slug_lower = market.slug.lower() if market.slug else ""
             
             # 方法1: 检查 slug 是否包含 15m 格式（如 btc-updown-15m-xxx 或 eth-updown-15m-xxx）
             # 根据实际 URL: https://polymarket.com/event/btc-updown-15m-1766507400
-            has_15m_slug = "-15m-" in slug_lower or slug_lower.startswith("btc-updown-15m") or \
-                          slug_lower.startswith("eth-updown-15m") or "updown-15m" in slug_lower
+            has_15m_slug = "-15m-" in slug_lower or "updown-15m" in slug_lower
             
             # 方法2: 检查标题是否匹配 "Up or Down" 格式
-            has_updown_format = "up or down" in question_lower or "up/down" in question_lower
-            
-            # 方法3: 检查是否包含 BTC/ETH 和 15分钟
-            has_btc = "btc" in question_lower or "bitcoin" in question_lower
-            has_eth = "eth" in question_lower or "ethereum" in question_lower
-            has_crypto = has_btc or has_eth
+            has_updown_format = _UPDOWN_PATTERN.search(question_lower) is not None
             
-            # 检查 15分钟时间格式（如 11:30-11:45）
-            import re
-            has_15min_time = bool(re.search(r'\d{1,2}:\d{2}-\d{1,2}:\d{2}', question_lower))
-            
-            # 或者检查 "15 min" 关键词
-            has_15min_keyword = any(keyword in question_lower for keyword in [
-                "15 min", "15min", "15-minute", "15 minute", 
-                "fifteen min", "fifteen-minute", "15m"
-            ])
-            
-            # 筛选条件：必须满足以下之一
+            # 筛选条件：必须满足以下之一（均已包含加密货币）
             # 1. slug 包含 15m 格式
-            # 2. 标题是 "Up or Down" 格式 + 包含加密货币 + 有时间范围
-            # 3. 包含加密货币 + 15分钟关键词 + 涨跌方向
-            
-            is_15m_market = False
-            
-            if has_15m_slug and has_crypto:
+            # 2. 标题是 "Up or Down" 格式 + 有时间范围
+            # 3. 15分钟关键词/时间范围 + 涨跌方向
+            if has_15m_slug:
                 # 直接通过 slug 识别
                 is_15m_market = True
-            elif has_updown_format and has_crypto and has_15min_time:
-                # "Bitcoin Up or Down" 格式 + 时间范围
-                is_15m_market = True
-            elif has_crypto and (has_15min_keyword or has_15min_time):
-                # 包含加密货币和15分钟关键词/时间
-                # 还需要检查是否有涨跌方向
-                has_direction = any(keyword in question_lower for keyword in [
-                    "up", "down", "above", "below", 
-                    "higher", "lower", "rise", "fall"
-                ])
-                if has_direction or has_updown_format:
+            else:
+                # 检查 15分钟时间格式（如 11:30-11:45）或 "15 min" 关键词
+                has_15min_time = _TIME_RANGE_PATTERN.search(question_lower) is not None
+                if has_updown_format and has_15min_time:
+                    # "Bitcoin Up or Down" 格式 + 时间范围
                     is_15m_market = True
+                elif has_15min_time or _15MIN_KEYWORD_PATTERN.search(question_lower):
+                    # 包含15分钟关键词/时间，还需要检查是否有涨跌方向
+                    is_15m_market = has_updown_format or _DIRECTION_PATTERN.search(question_lower) is not None
+                else:
+                    is_15m_market = False
             
             if not is_15m_market:
                 continue
             
             # 排除其他类型的市场
-            exclude_keywords = [
-                "ncaab", "nfl", "nba", "mlb", "soccer", "football",
-                "election", "president", "trump", "biden",
-                "stock", "sp500", "nasdaq", "price will hit",  # 排除价格预测市场
-                "will hit", "before 2026", "in 2025"  # 排除长期预测
-            ]
-            
-            if any(exclude in question_lower for exclude in exclude_keywords):
+            if _EXCLUDE_PATTERN.search(question_lower):
                 continue
             
             filtered.append(market)